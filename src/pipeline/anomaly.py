@@ -0,0 +1,149 @@
+import os
+from collections import deque
+
+FAILURE_CRITICAL_RATE = 0.30
+FAILURE_WARNING_RATE = 0.15
+FAILURE_WARNING_MIN_PROCESSED = 20
+BASELINE_MULTIPLIER = 2
+BASELINE_MIN_SAMPLES = 3
+BASELINE_MIN_ERROR_RATE = 0.05
+
+WINDOW_SIZE_DEFAULT = 50
+HOST_WINDOW_SIZE_DEFAULT = 20
+HOST_MIN_SAMPLES = 10
+LATENCY_MIN_EXCESS_MS = 500
+
+ACTIONS = ("abort", "slow_down", "pause_host", "ignore")
+DEFAULT_POLICY = {
+    "critical_failure_rate": "abort",
+    "warning_failure_rate": "slow_down",
+    "host_failure_rate": "pause_host",
+    "latency": "slow_down",
+}
+
+
+def failure_rate_alerts(processed: int, errors: int, baseline: dict | None) -> list[dict]:
+    alerts = []
+    error_rate = (errors / processed) if processed else 0.0
+
+    if processed > 0 and error_rate >= FAILURE_CRITICAL_RATE:
+        alerts.append(
+            {
+                "alert_type": "anomalous_failure_rate",
+                "severity": "critical",
+                "message": f"Failure rate is high ({error_rate:.2%}).",
+                "details": {"error_rate": error_rate, "errors": errors, "processed": processed},
+            }
+        )
+    elif processed >= FAILURE_WARNING_MIN_PROCESSED and error_rate >= FAILURE_WARNING_RATE:
+        alerts.append(
+            {
+                "alert_type": "anomalous_failure_rate",
+                "severity": "warning",
+                "message": f"Failure rate increased ({error_rate:.2%}).",
+                "details": {"error_rate": error_rate, "errors": errors, "processed": processed},
+            }
+        )
+
+    baseline = baseline or {}
+    avg_error_rate = baseline.get("avg_error_rate", 0.0)
+    if baseline.get("sample_count", 0) >= BASELINE_MIN_SAMPLES and avg_error_rate > 0:
+        if error_rate > avg_error_rate * BASELINE_MULTIPLIER and error_rate >= BASELINE_MIN_ERROR_RATE:
+            alerts.append(
+                {
+                    "alert_type": "anomalous_failure_rate",
+                    "severity": "warning",
+                    "message": "Failure rate is more than 2x recent baseline.",
+                    "details": {
+                        "current_error_rate": error_rate,
+                        "baseline_error_rate": avg_error_rate,
+                    },
+                }
+            )
+
+    return alerts
+
+
+def load_policy(overrides: dict | None = None) -> dict:
+    policy = dict(DEFAULT_POLICY)
+    for rule in policy:
+        env_value = os.getenv(f"INGEST_ANOMALY_{rule.upper()}")
+        if env_value:
+            policy[rule] = env_value
+    policy.update(overrides or {})
+    for rule, action in policy.items():
+        if action not in ACTIONS:
+            raise ValueError(f"Anomaly policy for {rule} must be one of {ACTIONS}, got {action!r}")
+    return policy
+
+
+class RunMonitor:
+    def __init__(
+        self,
+        baseline: dict | None = None,
+        policy: dict | None = None,
+        window_size: int = WINDOW_SIZE_DEFAULT,
+        host_window_size: int = HOST_WINDOW_SIZE_DEFAULT,
+    ):
+        self.baseline = baseline or {}
+        self.policy = load_policy(policy)
+        self.window = deque(maxlen=window_size)
+        self.host_window_size = host_window_size
+        self.host_windows = {}
+
+    def _anomaly(self, rule: str, alert: dict, host: str | None = None) -> dict:
+        anomaly = {**alert, "rule": rule, "action": self.policy[rule]}
+        if host is not None:
+            anomaly["details"] = {**alert["details"], "host": host}
+        return anomaly
+
+    def _slow(self, window) -> bool:
+        baseline_ms = self.baseline.get("avg_request_ms", 0.0)
+        if self.baseline.get("sample_count", 0) < BASELINE_MIN_SAMPLES or baseline_ms <= 0:
+            return False
+        window_ms = sum(ms for _, ms in window) / len(window)
+        return window_ms > baseline_ms * BASELINE_MULTIPLIER and window_ms - baseline_ms > LATENCY_MIN_EXCESS_MS
+
+    def host_healthy(self, host: str) -> bool:
+        window = self.host_windows.get(host)
+        if not window or len(window) < HOST_MIN_SAMPLES:
+            return False
+        errors = sum(f for f, _ in window)
+        return errors / len(window) < FAILURE_WARNING_RATE and not self._slow(window)
+
+    def observe(self, host: str, failed: bool, elapsed_ms: float) -> list[dict]:
+        self.window.append((failed, elapsed_ms))
+        host_window = self.host_windows.setdefault(host, deque(maxlen=self.host_window_size))
+        host_window.append((failed, elapsed_ms))
+
+        anomalies = []
+        if len(host_window) >= HOST_MIN_SAMPLES:
+            host_errors = sum(f for f, _ in host_window)
+            if host_errors / len(host_window) >= FAILURE_CRITICAL_RATE:
+                alert = failure_rate_alerts(len(host_window), host_errors, None)[0]
+                anomalies.append(self._anomaly("host_failure_rate", alert, host))
+                host_window.clear()
+
+        if len(self.window) >= FAILURE_WARNING_MIN_PROCESSED:
+            processed = len(self.window)
+            errors = sum(f for f, _ in self.window)
+            for alert in failure_rate_alerts(processed, errors, self.baseline):
+                rule = "critical_failure_rate" if alert["severity"] == "critical" else "warning_failure_rate"
+                anomalies.append(self._anomaly(rule, alert))
+
+            if self._slow(self.window):
+                alert = {
+                    "alert_type": "performance_degradation",
+                    "severity": "warning",
+                    "message": "Request latency is more than 2x recent baseline.",
+                    "details": {
+                        "window_request_ms": sum(ms for _, ms in self.window) / processed,
+                        "baseline_request_ms": self.baseline["avg_request_ms"],
+                    },
+                }
+                anomalies.append(self._anomaly("latency", alert))
+
+        anomalies = [a for a in anomalies if a["action"] != "ignore"]
+        if any(a["rule"] != "host_failure_rate" for a in anomalies):
+            self.window.clear()
+        return anomalies
@@ -0,0 +1,61 @@
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+FAILURE_THRESHOLD_DEFAULT = 5
+RESET_TIMEOUT_DEFAULT = 120.0
+
+
+def is_host_failure(res: dict) -> bool:
+    status = res.get("status")
+    if status is None:
+        return not str(res.get("err", "")).startswith("Unhandled")
+    return 500 <= status <= 599
+
+
+class HostCircuitBreaker:
+    def __init__(
+        self,
+        failure_threshold: int = FAILURE_THRESHOLD_DEFAULT,
+        reset_timeout: float = RESET_TIMEOUT_DEFAULT,
+        now_fn=time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.now_fn = now_fn
+        self.states = {}
+        self.failures = {}
+        self.opened_at = {}
+
+    def state(self, host: str) -> str:
+        state = self.states.get(host, CLOSED)
+        if state == OPEN and self.now_fn() - self.opened_at[host] >= self.reset_timeout:
+            state = self.states[host] = HALF_OPEN
+        return state
+
+    def allow(self, host: str) -> bool:
+        return self.state(host) != OPEN
+
+    def open_hosts(self) -> list[str]:
+        return sorted(h for h in self.states if self.state(h) == OPEN)
+
+    def record_success(self, host: str):
+        self.states[host] = CLOSED
+        self.failures[host] = 0
+
+    def record_failure(self, host: str):
+        self.failures[host] = self.failures.get(host, 0) + 1
+        if self.states.get(host) == HALF_OPEN or self.failures[host] >= self.failure_threshold:
+            self.trip(host)
+
+    def trip(self, host: str):
+        self.states[host] = OPEN
+        self.opened_at[host] = self.now_fn()
+
+    def record(self, host: str, res: dict):
+        if is_host_failure(res):
+            self.record_failure(host)
+        else:
+            self.record_success(host)
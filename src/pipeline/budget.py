@@ -0,0 +1,42 @@
+import time
+from datetime import datetime
+
+INITIAL_REQUEST_SECS = 1.0
+EWMA_ALPHA = 0.3
+SAFETY_FACTOR = 0.9
+
+
+class RunBudget:
+    def __init__(
+        self,
+        deadline: datetime,
+        *,
+        initial_secs: float = INITIAL_REQUEST_SECS,
+        alpha: float = EWMA_ALPHA,
+        safety: float = SAFETY_FACTOR,
+        now_fn=time.monotonic,
+    ):
+        self.now_fn = now_fn
+        self.ends_at = now_fn() + (deadline - datetime.utcnow()).total_seconds()
+        self.alpha = alpha
+        self.safety = safety
+        self.overall_secs = initial_secs
+        self.host_secs = {}
+
+    def remaining(self) -> float:
+        return max(0.0, self.ends_at - self.now_fn())
+
+    def observe(self, host: str, secs: float):
+        self.overall_secs += self.alpha * (secs - self.overall_secs)
+        prev = self.host_secs.get(host)
+        self.host_secs[host] = secs if prev is None else prev + self.alpha * (secs - prev)
+
+    def estimate(self, host: str) -> float:
+        return self.host_secs.get(host, self.overall_secs)
+
+    def can_fit(self, host: str) -> bool:
+        return self.estimate(host) <= self.remaining()
+
+    def batch_size(self, max_size: int) -> int:
+        fits = int(self.remaining() * self.safety / max(self.overall_secs, 1e-3))
+        return max(0, min(max_size, fits))
@@ -1,45 +1,48 @@
-import os
+from contextlib import contextmanager
+from datetime import datetime, timedelta
 
-import psycopg2
+from .pool import pooled_connection
 
+ERROR_RETRY_COOLDOWN = timedelta(hours=1)
 
-def connect_db():
-    return psycopg2.connect(
-        host=os.getenv("DB_HOST"),
-        port=int(os.getenv("DB_PORT", "5432")),
-        dbname=os.getenv("DB_NAME"),
-        user=os.getenv("DB_USER"),
-        password=os.getenv("DB_PASSWORD"),
-    )
-
+PICK_PRIORITY_SQL = """
+        CASE
+          WHEN dc.url IS NULL OR dc.last_checked_at IS NULL THEN 3
+          WHEN (dc.status_code IS NULL OR dc.status_code NOT IN (200, 304))
+               AND dc.last_checked_at < {retry_errors_before} THEN 2
+          WHEN ss.lastmod IS NOT NULL AND (dc.fetched_at IS NULL OR ss.lastmod > dc.fetched_at) THEN 1
+          ELSE 0
+        END"""
 
-def pick_batch(cur, batch_size: int):
-    cur.execute(
-        """
-      SELECT dm.url, dc.etag, dc.last_modified
+PICK_BATCH_SQL = """
+      SELECT dm.url, dc.etag, dc.last_modified,
+             rd.final_url AS redirect_url,
+             rd.status_code AS redirect_status,
+             rd.last_confirmed_at AS redirect_confirmed_at
       FROM candidate_rk_docs_master dm
       LEFT JOIN candidate_rk_document_content dc ON dc.url = dm.url
-      WHERE dc.url IS NULL
+      LEFT JOIN candidate_rk_url_redirects rd ON rd.source_url = dm.url
+      LEFT JOIN candidate_rk_sitemap_staging ss ON ss.url = dm.url
+      WHERE (dc.url IS NULL
          OR dc.last_checked_at IS NULL
          OR dc.status_code IS DISTINCT FROM 200
-         OR dc.last_checked_at < (NOW() - INTERVAL '1 day')
-      ORDER BY COALESCE(dc.last_checked_at, TIMESTAMP '1970-01-01') ASC
-      LIMIT %s;
-    """,
-        (batch_size,),
-    )
-    return cur.fetchall()
-
+         OR dc.last_checked_at < (NOW() - INTERVAL '1 day'))
+        AND (dc.last_checked_at IS NULL OR dc.last_checked_at < {checked_before})
+        AND dm.removed_at IS NULL
+        AND lower(split_part(dm.url, '/', 3)) <> ALL({exclude_hosts}::text[])
+        AND dm.url <> ALL({exclude_urls}::text[])
+      ORDER BY{priority} DESC,
+        COALESCE(dc.last_checked_at, TIMESTAMP '1970-01-01') ASC
+      LIMIT {limit};
+"""
 
-def upsert_document_content(cur, payload: dict):
-    cur.execute(
-        """
+UPSERT_DOCUMENT_CONTENT_SQL = """
       INSERT INTO candidate_rk_document_content
         (url, etag, last_modified, content_hash, content, content_bytes, content_type,
          status_code, fetched_at, last_checked_at, error_message, was_truncated, is_too_large)
       VALUES
-        (%(url)s,%(etag)s,%(lm)s,%(ch)s,%(c)s,%(cb)s,%(ct)s,
-         %(sc)s,%(fa)s,%(lca)s,%(err)s,%(wt)s,%(tl)s)
+        ({url},{etag},{lm},{ch},{c},{cb},{ct},
+         {sc},{fa},{lca},{err},{wt},{tl})
       ON CONFLICT (url) DO UPDATE SET
         etag = COALESCE(EXCLUDED.etag, candidate_rk_document_content.etag),
         last_modified = COALESCE(EXCLUDED.last_modified, candidate_rk_document_content.last_modified),
@@ -53,6 +56,72 @@ def upsert_document_content(cur, payload: dict):
         error_message = EXCLUDED.error_message,
         was_truncated = EXCLUDED.was_truncated,
         is_too_large = EXCLUDED.is_too_large;
-    """,
-        payload,
+"""
+
+UPSERT_PARAMS = ("url", "etag", "lm", "ch", "c", "cb", "ct", "sc", "fa", "lca", "err", "wt", "tl")
+
+
+@contextmanager
+def connect_db():
+    with pooled_connection() as conn:
+        yield conn
+
+
+def _prepared_set(cur):
+    prepared = getattr(cur.connection, "prepared_statements", None)
+    return prepared if isinstance(prepared, set) else None
+
+
+def _ensure_prepared(cur, name: str, sql: str) -> bool:
+    prepared = _prepared_set(cur)
+    if prepared is None:
+        return False
+    if name not in prepared:
+        cur.execute(f"PREPARE {name} AS {sql}")
+        prepared.add(name)
+    return True
+
+
+def pick_batch_sql(
+    exclude_hosts: str, exclude_urls: str, retry_errors_before: str, checked_before: str, limit: str
+) -> str:
+    priority = PICK_PRIORITY_SQL.format(retry_errors_before=retry_errors_before)
+    return PICK_BATCH_SQL.format(
+        exclude_hosts=exclude_hosts,
+        exclude_urls=exclude_urls,
+        checked_before=checked_before,
+        priority=priority,
+        limit=limit,
     )
+
+
+def pick_batch(
+    cur,
+    batch_size: int,
+    exclude_hosts=(),
+    exclude_urls=(),
+    retry_errors_before: datetime | None = None,
+    checked_before: datetime | None = None,
+):
+    now = datetime.utcnow()
+    if retry_errors_before is None:
+        retry_errors_before = now - ERROR_RETRY_COOLDOWN
+    params = (list(exclude_hosts), list(exclude_urls), retry_errors_before, checked_before or now, batch_size)
+    if _ensure_prepared(cur, "rk_pick_batch", pick_batch_sql("$1", "$2", "$3::timestamp", "$4::timestamp", "$5")):
+        cur.execute("EXECUTE rk_pick_batch (%s, %s, %s, %s, %s);", params)
+    else:
+        cur.execute(pick_batch_sql("%s", "%s", "%s", "%s", "%s"), params)
+    return cur.fetchall()
+
+
+def upsert_document_content(cur, payload: dict):
+    positional = {k: f"${i}" for i, k in enumerate(UPSERT_PARAMS, start=1)}
+    if _ensure_prepared(cur, "rk_upsert_document_content", UPSERT_DOCUMENT_CONTENT_SQL.format(**positional)):
+        placeholders = ", ".join(["%s"] * len(UPSERT_PARAMS))
+        cur.execute(
+            f"EXECUTE rk_upsert_document_content ({placeholders});",
+            tuple(payload[k] for k in UPSERT_PARAMS),
+        )
+    else:
+        named = {k: f"%({k})s" for k in UPSERT_PARAMS}
+        cur.execute(UPSERT_DOCUMENT_CONTENT_SQL.format(**named), payload)
@@ -3,7 +3,10 @@ import time
 
 import requests
 
+from .warc import ArchiveMiss
+
 MAX_BYTES_DEFAULT = 1_000_000
+RETRIES_DEFAULT = 3
 
 
 def sha256(b: bytes) -> str:
@@ -23,6 +26,13 @@ def host_throttle_sleep(
     host_next[host] = now_fn() + host_delay
 
 
+def redirect_info(r) -> dict:
+    hops = [(h.url, h.status_code) for h in (r.history or [])]
+    if not hops:
+        return {}
+    return {"final_url": r.url, "redirects": hops}
+
+
 def fetch_url(
     session: requests.Session,
     url: str,
@@ -31,9 +41,10 @@ def fetch_url(
     last_modified: str | None = None,
     max_bytes: int = MAX_BYTES_DEFAULT,
     timeout=(5, 20),
-    retries: int = 3,
+    retries: int = RETRIES_DEFAULT,
     backoff: float = 0.8,
     user_agent: str = "rk-doc-ingestor/1.0",
+    recorder=None,
 ):
     headers = {"User-Agent": user_agent}
     if etag:
@@ -51,8 +62,11 @@ def fetch_url(
                 allow_redirects=True,
             )
 
+            if recorder is not None and r.status_code != 200:
+                recorder.record(r)
+
             if r.status_code == 304:
-                return {"status": 304}
+                return {"status": 304, **redirect_info(r)}
 
             if r.status_code != 200:
                 if 500 <= r.status_code <= 599 and a < retries:
@@ -62,6 +76,7 @@ def fetch_url(
                     "status": r.status_code,
                     "err": f"HTTP {r.status_code}",
                     "ctype": r.headers.get("Content-Type"),
+                    **redirect_info(r),
                 }
 
             buf = bytearray()
@@ -78,6 +93,8 @@ def fetch_url(
                 buf.extend(chunk)
 
             raw = bytes(buf)
+            if recorder is not None:
+                recorder.record(r, raw, truncated=too_large)
             return {
                 "status": 200,
                 "etag": r.headers.get("ETag"),
@@ -88,6 +105,7 @@ def fetch_url(
                 "text": raw.decode(r.encoding or "utf-8", errors="replace"),
                 "trunc": too_large,
                 "too_large": too_large,
+                **redirect_info(r),
             }
 
         except (requests.Timeout, requests.ConnectionError) as e:
@@ -95,5 +113,7 @@ def fetch_url(
                 time.sleep(backoff * (2**a))
                 continue
             return {"status": None, "err": f"{type(e).__name__}: {e}"}
+        except ArchiveMiss:
+            raise
         except Exception as e:
             return {"status": None, "err": f"Unhandled: {type(e).__name__}: {e}"}
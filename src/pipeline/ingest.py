@@ -1,11 +1,53 @@
+import os
+import time
+from contextlib import nullcontext
 from datetime import datetime
 from urllib.parse import urlparse
 
 import requests
 from psycopg2.extras import DictCursor
 
-from .db import connect_db, pick_batch, upsert_document_content
-from .http import fetch_url, host_throttle_sleep
+from .anomaly import RunMonitor
+from .breaker import FAILURE_THRESHOLD_DEFAULT, HALF_OPEN, RESET_TIMEOUT_DEFAULT, HostCircuitBreaker
+from .budget import RunBudget
+from .db import ERROR_RETRY_COOLDOWN, connect_db, pick_batch, upsert_document_content
+from .http import RETRIES_DEFAULT, fetch_url, host_throttle_sleep
+from .redirects import (
+    REVERIFY_AFTER_DEFAULT,
+    canonicalize_url,
+    ensure_redirect_table,
+    known_target,
+    record_fetch_redirects,
+)
+from .sitemap_diff import ensure_discovery_schema
+from .warc import ArchiveMiss, ReplaySession, WarcArchive, WarcWriter
+
+HTTP_MODES = ("live", "record", "replay")
+WARC_DIR_DEFAULT = "warc"
+SLOW_DOWN_MIN_DELAY = 0.5
+SLOW_DOWN_MAX_DELAY = 5.0
+
+
+def open_session(http_mode: str, warc_dir):
+    if http_mode == "replay":
+        return ReplaySession(WarcArchive(warc_dir))
+    return requests.Session()
+
+
+def ensure_ingest_schema(cur):
+    ensure_redirect_table(cur)
+    ensure_discovery_schema(cur)
+
+
+def reusable_result(cached: tuple | None, etag, lm) -> dict | None:
+    if cached is None:
+        return None
+    res, cached_etag, cached_lm = cached
+    if res.get("status") == 200:
+        return res
+    if res.get("status") == 304 and (cached_etag, cached_lm) == (etag, lm):
+        return res
+    return None
 
 
 def run_content_ingest(
@@ -13,24 +55,137 @@ def run_content_ingest(
     batch_size: int = 200,
     host_delay: float = 0.30,
     max_bytes: int = 1_000_000,
+    redirect_reverify_after=REVERIFY_AFTER_DEFAULT,
+    breaker_failure_threshold: int = FAILURE_THRESHOLD_DEFAULT,
+    breaker_reset_timeout: float = RESET_TIMEOUT_DEFAULT,
+    http_mode: str | None = None,
+    warc_dir=None,
+    profiler=None,
+    baseline: dict | None = None,
+    anomaly_policy: dict | None = None,
+    deadline: datetime | None = None,
 ):
+    http_mode = http_mode or os.getenv("INGEST_HTTP_MODE", "live")
+    if http_mode not in HTTP_MODES:
+        raise ValueError(f"http_mode must be one of {HTTP_MODES}, got {http_mode!r}")
+    warc_dir = warc_dir or os.getenv("INGEST_WARC_DIR", WARC_DIR_DEFAULT)
+    retries = RETRIES_DEFAULT
+    if http_mode == "replay":
+        host_delay = 0.0
+        retries = 0
+
+    run_started_at = datetime.utcnow()
     host_next = {}
-    stats = {"processed": 0, "ok200": 0, "ok304": 0, "err": 0}
+    host_delays = {}
+    skipped_urls = set()
+    breaker = HostCircuitBreaker(breaker_failure_threshold, breaker_reset_timeout)
+    monitor = RunMonitor(baseline, anomaly_policy)
+    budget = RunBudget(deadline) if deadline is not None else None
+    stats = {
+        "processed": 0,
+        "ok200": 0,
+        "ok304": 0,
+        "err": 0,
+        "collapsed": 0,
+        "deferred": 0,
+        "deferred_hosts": [],
+        "replay_miss": 0,
+        "fetch_count": 0,
+        "fetch_ms": 0.0,
+        "anomalies": [],
+        "aborted": False,
+        "deadline_reached": False,
+    }
 
-    with connect_db() as conn, conn.cursor(cursor_factory=DictCursor) as cur, requests.Session() as s:
+    with (
+        connect_db() as conn,
+        conn.cursor(cursor_factory=DictCursor) as cur,
+        open_session(http_mode, warc_dir) as s,
+        WarcWriter(warc_dir) if http_mode == "record" else nullcontext() as recorder,
+    ):
         while True:
-            batch = pick_batch(cur, batch_size)
+            size = budget.batch_size(batch_size) if budget is not None else batch_size
+            if size == 0:
+                stats["deadline_reached"] = True
+                break
+            retry_errors_before = min(run_started_at, datetime.utcnow() - ERROR_RETRY_COOLDOWN)
+            batch = pick_batch(
+                cur, size, breaker.open_hosts(), skipped_urls, retry_errors_before, checked_before=run_started_at
+            )
             if not batch:
                 break
 
+            batch_results = {}
+
             for row in batch:
                 url, etag, lm = row["url"], row["etag"], row["last_modified"]
 
-                host = urlparse(url).netloc or "unknown"
-                host_throttle_sleep(host_next, host, host_delay)
-
                 checked_at = datetime.utcnow()
-                res = fetch_url(s, url, etag=etag, last_modified=lm, max_bytes=max_bytes)
+                target = known_target(row, checked_at, redirect_reverify_after)
+                fetch_as = canonicalize_url(target or url)
+
+                host = None
+                row_started = time.perf_counter()
+                res = reusable_result(batch_results.get(fetch_as), etag, lm)
+                if res is not None:
+                    stats["collapsed"] += 1
+                else:
+                    host = urlparse(fetch_as).netloc or "unknown"
+                    if not breaker.allow(host):
+                        stats["deferred"] += 1
+                        skipped_urls.add(url)
+                        if host not in stats["deferred_hosts"]:
+                            stats["deferred_hosts"].append(host)
+                        continue
+                    if budget is not None and not budget.can_fit(host):
+                        stats["deadline_reached"] = True
+                        break
+
+                    probe = breaker.state(host) == HALF_OPEN
+                    host_throttle_sleep(host_next, host, host_delays.get(host, host_delay))
+                    started = time.perf_counter()
+                    try:
+                        res = fetch_url(
+                            s,
+                            fetch_as,
+                            etag=etag,
+                            last_modified=lm,
+                            max_bytes=max_bytes,
+                            retries=0 if probe else retries,
+                            recorder=recorder,
+                        )
+                    except ArchiveMiss:
+                        stats["replay_miss"] += 1
+                        skipped_urls.add(url)
+                        continue
+                    elapsed = time.perf_counter() - started
+                    stats["fetch_count"] += 1
+                    stats["fetch_ms"] += elapsed * 1000
+                    if profiler is not None:
+                        profiler.record_request(host, fetch_as, started, elapsed, res.get("status"))
+                    breaker.record(host, res)
+
+                    anomalies = monitor.observe(host, res.get("status") not in (200, 304), elapsed * 1000)
+                    for anomaly in anomalies:
+                        stats["anomalies"].append(anomaly)
+                        if anomaly["action"] == "pause_host":
+                            breaker.trip(host)
+                        elif anomaly["action"] == "slow_down":
+                            delay = host_delays.get(host, host_delay)
+                            host_delays[host] = min(max(delay * 2, SLOW_DOWN_MIN_DELAY), SLOW_DOWN_MAX_DELAY)
+                        elif anomaly["action"] == "abort":
+                            stats["aborted"] = True
+                    if not anomalies and host in host_delays and monitor.host_healthy(host):
+                        relaxed = host_delays.pop(host) / 2
+                        if relaxed > host_delay and relaxed >= SLOW_DOWN_MIN_DELAY:
+                            host_delays[host] = relaxed
+                    batch_results[fetch_as] = (res, etag, lm)
+                    if res.get("final_url"):
+                        landed = {k: v for k, v in res.items() if k not in ("final_url", "redirects")}
+                        batch_results[canonicalize_url(res["final_url"])] = (landed, etag, lm)
+
+                if target is None:
+                    record_fetch_redirects(cur, row, res, checked_at)
 
                 stats["processed"] += 1
 
@@ -96,6 +251,14 @@ def run_content_ingest(
                         },
                     )
 
+                if budget is not None and host is not None:
+                    budget.observe(host, time.perf_counter() - row_started)
+                if stats["aborted"]:
+                    break
+
             conn.commit()
 
+            if stats["aborted"] or stats["deadline_reached"]:
+                break
+
     return stats
@@ -0,0 +1,122 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import extensions, pool
+
+POOL_MIN_DEFAULT = 1
+POOL_MAX_DEFAULT = 5
+HEALTHCHECK_IDLE_SECS_DEFAULT = 30.0
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class PooledConnection(extensions.connection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared_statements = set()
+        self.last_used_at = time.monotonic()
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+def connection_kwargs() -> dict:
+    return {
+        "host": os.getenv("DB_HOST"),
+        "port": int(os.getenv("DB_PORT", "5432")),
+        "dbname": os.getenv("DB_NAME"),
+        "user": os.getenv("DB_USER"),
+        "password": os.getenv("DB_PASSWORD"),
+        "keepalives": 1,
+        "keepalives_idle": _env_int("DB_KEEPALIVES_IDLE", 30),
+        "keepalives_interval": _env_int("DB_KEEPALIVES_INTERVAL", 10),
+        "keepalives_count": _env_int("DB_KEEPALIVES_COUNT", 3),
+        "connection_factory": PooledConnection,
+    }
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.closed:
+            _pool = pool.ThreadedConnectionPool(
+                _env_int("DB_POOL_MIN", POOL_MIN_DEFAULT),
+                _env_int("DB_POOL_MAX", POOL_MAX_DEFAULT),
+                **connection_kwargs(),
+            )
+        return _pool
+
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None and not _pool.closed:
+            _pool.closeall()
+        _pool = None
+
+
+def is_healthy(conn, idle_secs: float) -> bool:
+    if conn.closed:
+        return False
+    last_used_at = getattr(conn, "last_used_at", None)
+    if last_used_at is not None and time.monotonic() - last_used_at < idle_secs:
+        return True
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1;")
+        conn.rollback()
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        return False
+    return True
+
+
+def reset_prepared(conn):
+    prepared = getattr(conn, "prepared_statements", None)
+    if not prepared:
+        return
+    with conn.cursor() as cur:
+        cur.execute("DEALLOCATE ALL;")
+    conn.commit()
+    prepared.clear()
+
+
+def _checkout(p, idle_secs: float):
+    for _ in range(p.maxconn + 1):
+        conn = p.getconn()
+        if is_healthy(conn, idle_secs):
+            return conn
+        p.putconn(conn, close=True)
+    raise psycopg2.OperationalError("No healthy connection available in pool")
+
+
+@contextmanager
+def pooled_connection():
+    p = get_pool()
+    conn = _checkout(p, _env_float("DB_POOL_HEALTHCHECK_IDLE_SECS", HEALTHCHECK_IDLE_SECS_DEFAULT))
+    discard = False
+    try:
+        yield conn
+        conn.commit()
+    except BaseException:
+        try:
+            conn.rollback()
+            reset_prepared(conn)
+        except psycopg2.Error:
+            discard = True
+        raise
+    finally:
+        discard = discard or bool(conn.closed)
+        if not discard:
+            conn.last_used_at = time.monotonic()
+        p.putconn(conn, close=discard)
@@ -0,0 +1,102 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import random
+import time
+import tracemalloc
+from pathlib import Path
+
+PROFILE_DIR_DEFAULT = "profiles"
+TOP_N = 25
+
+
+def profiling_enabled(flag: bool = False, rand_fn=random.random) -> bool:
+    if flag or os.getenv("INGEST_PROFILE", "").lower() in ("1", "true", "yes"):
+        return True
+    rate = float(os.getenv("INGEST_PROFILE_SAMPLE_RATE") or 0)
+    return rate > 0 and rand_fn() < rate
+
+
+class RunProfiler:
+    def __init__(self, frames: int = 10):
+        self.frames = frames
+        self.profile = cProfile.Profile()
+        self.timeline = []
+        self.t0 = None
+        self.snapshot = None
+        self.peak_bytes = 0
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        tracemalloc.start(self.frames)
+        self.profile.enable()
+        return self
+
+    def __exit__(self, *exc):
+        self.profile.disable()
+        self.snapshot = tracemalloc.take_snapshot()
+        self.peak_bytes = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    def record_request(self, host: str, url: str, started: float, elapsed: float, status):
+        self.timeline.append(
+            {
+                "host": host,
+                "url": url,
+                "start_ms": round((started - self.t0) * 1000, 1),
+                "duration_ms": round(elapsed * 1000, 1),
+                "status": status,
+            }
+        )
+
+    def cpu_top(self, n: int = TOP_N) -> list[dict]:
+        stats = pstats.Stats(self.profile)
+        rows = sorted(stats.stats.items(), key=lambda kv: kv[1][3], reverse=True)[:n]
+        return [
+            {
+                "function": f"{path}:{line}({name})",
+                "calls": nc,
+                "tottime_s": round(tt, 4),
+                "cumtime_s": round(ct, 4),
+            }
+            for (path, line, name), (_cc, nc, tt, ct, _callers) in rows
+        ]
+
+    def alloc_top(self, n: int = TOP_N) -> list[dict]:
+        return [
+            {"location": str(stat.traceback[0]), "size_bytes": stat.size, "count": stat.count}
+            for stat in self.snapshot.statistics("lineno")[:n]
+        ]
+
+    def host_summary(self) -> dict:
+        hosts = {}
+        for event in self.timeline:
+            h = hosts.setdefault(event["host"], {"requests": 0, "total_ms": 0.0, "max_ms": 0.0})
+            h["requests"] += 1
+            h["total_ms"] += event["duration_ms"]
+            h["max_ms"] = max(h["max_ms"], event["duration_ms"])
+        for h in hosts.values():
+            h["avg_ms"] = round(h["total_ms"] / h["requests"], 1)
+            h["total_ms"] = round(h["total_ms"], 1)
+        return hosts
+
+    def save(self, directory, metric_id: int) -> dict:
+        out = Path(directory) / str(metric_id)
+        out.mkdir(parents=True, exist_ok=True)
+
+        self.profile.dump_stats(out / "cpu.pstats")
+        text = io.StringIO()
+        pstats.Stats(self.profile, stream=text).sort_stats("cumulative").print_stats(TOP_N * 2)
+        (out / "cpu_top.txt").write_text(text.getvalue(), encoding="utf-8")
+        self.snapshot.dump(str(out / "alloc.tracemalloc"))
+        (out / "timeline.json").write_text(json.dumps(self.timeline, indent=1), encoding="utf-8")
+
+        return {
+            "artifact_dir": str(out),
+            "cpu_top": self.cpu_top(),
+            "alloc_top": self.alloc_top(),
+            "host_summary": self.host_summary(),
+            "peak_traced_bytes": self.peak_bytes,
+        }
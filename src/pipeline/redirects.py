@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit, urlunsplit
+
+PERMANENT_STATUSES = (301, 308)
+REVERIFY_AFTER_DEFAULT = timedelta(days=7)
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def canonicalize_url(url: str) -> str:
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    path = parts.path or "/"
+    return urlunsplit((scheme, host, path, parts.query, ""))
+
+
+def ensure_redirect_table(cur):
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS candidate_rk_url_redirects (
+          source_url TEXT PRIMARY KEY,
+          final_url TEXT NOT NULL,
+          status_code INTEGER NOT NULL,
+          hops TEXT[] NOT NULL DEFAULT '{}',
+          first_seen_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+          last_confirmed_at TIMESTAMP WITHOUT TIME ZONE NOT NULL
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_url_redirects_final_url
+          ON candidate_rk_url_redirects (final_url);
+        """
+    )
+
+
+def known_target(
+    row,
+    now: datetime,
+    reverify_after: timedelta = REVERIFY_AFTER_DEFAULT,
+) -> str | None:
+    if row.get("redirect_url") is None or row.get("redirect_status") not in PERMANENT_STATUSES:
+        return None
+    if row["redirect_confirmed_at"] < now - reverify_after:
+        return None
+    return row["redirect_url"]
+
+
+def upsert_redirect(cur, *, source_url: str, final_url: str, status: int, hops: list[str], seen_at: datetime):
+    cur.execute(
+        """
+        INSERT INTO candidate_rk_url_redirects
+          (source_url, final_url, status_code, hops, first_seen_at, last_confirmed_at)
+        VALUES (%s, %s, %s, %s, %s, %s)
+        ON CONFLICT (source_url) DO UPDATE SET
+          final_url = EXCLUDED.final_url,
+          status_code = EXCLUDED.status_code,
+          hops = EXCLUDED.hops,
+          last_confirmed_at = EXCLUDED.last_confirmed_at;
+        """,
+        (source_url, final_url, status, hops, seen_at, seen_at),
+    )
+
+
+def delete_redirect(cur, source_url: str):
+    cur.execute(
+        "DELETE FROM candidate_rk_url_redirects WHERE source_url = %s;",
+        (source_url,),
+    )
+
+
+def record_fetch_redirects(cur, row, res: dict, checked_at: datetime):
+    url = row["url"]
+    hops = res.get("redirects") or []
+    if hops:
+        status = next((sc for _, sc in hops if sc not in PERMANENT_STATUSES), hops[0][1])
+        upsert_redirect(
+            cur,
+            source_url=url,
+            final_url=canonicalize_url(res["final_url"]),
+            status=status,
+            hops=[h[0] for h in hops[1:]],
+            seen_at=checked_at,
+        )
+    elif row.get("redirect_url") is not None and res.get("status") in (200, 304):
+        delete_redirect(cur, url)
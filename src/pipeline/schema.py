@@ -0,0 +1,262 @@
+import re
+from datetime import date, datetime
+
+from psycopg2 import sql
+
+CONTENT_TABLE = "candidate_rk_document_content"
+CONTENT_PARTITIONS_DEFAULT = 16
+MONTHS_AHEAD_DEFAULT = 2
+
+TIME_PARTITIONED = {
+    "pipeline_metrics": {
+        "key": "run_finished_at",
+        "primary_key": ("metric_id", "run_finished_at"),
+        "serial": "metric_id",
+    },
+    "alerts": {
+        "key": "triggered_at",
+        "primary_key": ("alert_id", "triggered_at"),
+        "serial": "alert_id",
+    },
+}
+
+
+def month_start(d: date) -> date:
+    return date(d.year, d.month, 1)
+
+
+def add_months(d: date, n: int) -> date:
+    months = d.year * 12 + d.month - 1 + n
+    return date(months // 12, months % 12 + 1, 1)
+
+
+def month_partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month:%Y%m}"
+
+
+def is_partitioned(cur, table: str) -> bool:
+    cur.execute(
+        """
+        SELECT EXISTS (
+          SELECT 1
+          FROM pg_partitioned_table pt
+          JOIN pg_class c ON c.oid = pt.partrelid
+          WHERE c.relname = %s AND pg_table_is_visible(c.oid)
+        );
+        """,
+        (table,),
+    )
+    return bool(cur.fetchone()[0])
+
+
+def list_partitions(cur, table: str) -> list[str]:
+    cur.execute(
+        """
+        SELECT child.relname
+        FROM pg_inherits i
+        JOIN pg_class parent ON parent.oid = i.inhparent
+        JOIN pg_class child ON child.oid = i.inhrelid
+        WHERE parent.relname = %s AND pg_table_is_visible(parent.oid)
+        ORDER BY child.relname;
+        """,
+        (table,),
+    )
+    return [row[0] for row in cur.fetchall()]
+
+
+def _rename_to_legacy(cur, table: str) -> tuple[str, list[str]]:
+    legacy = f"{table}_legacy"
+    cur.execute(
+        sql.SQL("ALTER TABLE {} RENAME TO {};").format(sql.Identifier(table), sql.Identifier(legacy))
+    )
+    cur.execute(
+        """
+        SELECT i.relname, pg_get_indexdef(i.oid), ix.indisprimary
+        FROM pg_index ix
+        JOIN pg_class i ON i.oid = ix.indexrelid
+        WHERE ix.indrelid = %s::regclass;
+        """,
+        (legacy,),
+    )
+    index_defs = []
+    for name, definition, is_primary in cur.fetchall():
+        cur.execute(
+            sql.SQL("ALTER INDEX {} RENAME TO {};").format(
+                sql.Identifier(name), sql.Identifier(f"{name[:56]}_legacy")
+            )
+        )
+        if not is_primary:
+            index_defs.append(re.sub(r" ON \S+ USING ", f" ON {table} USING ", definition, count=1))
+    return legacy, index_defs
+
+
+def _view_keyword(kind: str) -> sql.SQL:
+    return sql.SQL("MATERIALIZED VIEW" if kind == "m" else "VIEW")
+
+
+def _detach_views(cur, table: str) -> list[tuple]:
+    cur.execute(
+        """
+        SELECT DISTINCT v.oid, v.relname, v.relkind, pg_get_viewdef(v.oid)
+        FROM pg_depend d
+        JOIN pg_rewrite r ON r.oid = d.objid
+        JOIN pg_class v ON v.oid = r.ev_class
+        WHERE d.classid = 'pg_rewrite'::regclass
+          AND d.refobjid = %s::regclass
+          AND v.oid <> d.refobjid;
+        """,
+        (table,),
+    )
+    views = []
+    for oid, name, kind, definition in cur.fetchall():
+        cur.execute("SELECT pg_get_indexdef(indexrelid) FROM pg_index WHERE indrelid = %s;", (oid,))
+        index_defs = [row[0] for row in cur.fetchall()]
+        views.append((name, kind, definition.strip().rstrip(";"), index_defs))
+    for name, kind, _, _ in views:
+        cur.execute(sql.SQL("DROP {} {};").format(_view_keyword(kind), sql.Identifier(name)))
+    return views
+
+
+def _restore_views(cur, views: list[tuple]):
+    for name, kind, definition, index_defs in views:
+        cur.execute(
+            sql.SQL("CREATE {} {} AS {};").format(_view_keyword(kind), sql.Identifier(name), sql.SQL(definition))
+        )
+        for index_def in index_defs:
+            cur.execute(index_def)
+
+
+def _create_like(cur, table: str, legacy: str, partition_by: sql.Composable):
+    cur.execute(
+        sql.SQL(
+            "CREATE TABLE {} (LIKE {} INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING STORAGE) PARTITION BY {};"
+        ).format(sql.Identifier(table), sql.Identifier(legacy), partition_by)
+    )
+
+
+def _copy_rows(cur, table: str, legacy: str):
+    cur.execute(
+        sql.SQL("INSERT INTO {} SELECT * FROM {};").format(sql.Identifier(table), sql.Identifier(legacy))
+    )
+
+
+def partition_document_content(cur, partitions: int = CONTENT_PARTITIONS_DEFAULT) -> bool:
+    if is_partitioned(cur, CONTENT_TABLE):
+        return False
+
+    views = _detach_views(cur, CONTENT_TABLE)
+    legacy, index_defs = _rename_to_legacy(cur, CONTENT_TABLE)
+    _create_like(cur, CONTENT_TABLE, legacy, sql.SQL("HASH (url)"))
+    cur.execute(sql.SQL("ALTER TABLE {} ADD PRIMARY KEY (url);").format(sql.Identifier(CONTENT_TABLE)))
+    for i in range(partitions):
+        part = sql.Identifier(f"{CONTENT_TABLE}_h{i:02d}")
+        cur.execute(
+            sql.SQL("CREATE TABLE {} PARTITION OF {} FOR VALUES WITH (MODULUS {}, REMAINDER {});").format(
+                part, sql.Identifier(CONTENT_TABLE), sql.Literal(partitions), sql.Literal(i)
+            )
+        )
+        cur.execute(
+            sql.SQL(
+                "ALTER TABLE {} SET (autovacuum_vacuum_scale_factor = 0.05, "
+                "toast.autovacuum_vacuum_scale_factor = 0.05);"
+            ).format(part)
+        )
+    _copy_rows(cur, CONTENT_TABLE, legacy)
+    for definition in index_defs:
+        cur.execute(definition)
+    _restore_views(cur, views)
+    return True
+
+
+def create_month_partition(cur, table: str, month: date):
+    cur.execute(
+        sql.SQL("CREATE TABLE IF NOT EXISTS {} PARTITION OF {} FOR VALUES FROM ({}) TO ({});").format(
+            sql.Identifier(month_partition_name(table, month)),
+            sql.Identifier(table),
+            sql.Literal(month),
+            sql.Literal(add_months(month, 1)),
+        )
+    )
+
+
+def ensure_time_partitions(cur, today: date | None = None, months_ahead: int = MONTHS_AHEAD_DEFAULT):
+    first = month_start(today or datetime.utcnow().date())
+    for table in TIME_PARTITIONED:
+        if not is_partitioned(cur, table):
+            continue
+        for n in range(months_ahead + 1):
+            create_month_partition(cur, table, add_months(first, n))
+
+
+def partition_time_table(cur, table: str, today: date | None = None, months_ahead: int = MONTHS_AHEAD_DEFAULT) -> bool:
+    if is_partitioned(cur, table):
+        return False
+    spec = TIME_PARTITIONED[table]
+
+    cur.execute("SELECT pg_get_serial_sequence(%s, %s);", (table, spec["serial"]))
+    sequence = cur.fetchone()[0]
+    cur.execute(
+        """
+        SELECT conrelid::regclass::text, conname
+        FROM pg_constraint
+        WHERE contype = 'f'
+          AND (conrelid = %s::regclass OR confrelid = %s::regclass);
+        """,
+        (table, table),
+    )
+    for owner, fk in cur.fetchall():
+        cur.execute(sql.SQL("ALTER TABLE {} DROP CONSTRAINT {};").format(sql.SQL(owner), sql.Identifier(fk)))
+
+    views = _detach_views(cur, table)
+    legacy, index_defs = _rename_to_legacy(cur, table)
+    _create_like(cur, table, legacy, sql.SQL("RANGE ({})").format(sql.Identifier(spec["key"])))
+    cur.execute(
+        sql.SQL("ALTER TABLE {} ADD PRIMARY KEY ({});").format(
+            sql.Identifier(table), sql.SQL(", ").join(map(sql.Identifier, spec["primary_key"]))
+        )
+    )
+    if sequence:
+        cur.execute(
+            sql.SQL("ALTER SEQUENCE {} OWNED BY {}.{};").format(
+                sql.SQL(sequence), sql.Identifier(table), sql.Identifier(spec["serial"])
+            )
+        )
+
+    cur.execute(
+        sql.SQL("SELECT MIN({}) FROM {};").format(sql.Identifier(spec["key"]), sql.Identifier(legacy))
+    )
+    oldest = cur.fetchone()[0]
+    current = month_start(today or datetime.utcnow().date())
+    last = add_months(current, months_ahead)
+    month = min(month_start(oldest.date()), current) if oldest else current
+    while month <= last:
+        create_month_partition(cur, table, month)
+        month = add_months(month, 1)
+    cur.execute(
+        sql.SQL("CREATE TABLE {} PARTITION OF {} DEFAULT;").format(
+            sql.Identifier(f"{table}_default"), sql.Identifier(table)
+        )
+    )
+
+    _copy_rows(cur, table, legacy)
+    for definition in index_defs:
+        cur.execute(definition)
+    _restore_views(cur, views)
+    return True
+
+
+def drop_expired_partitions(cur, table: str, keep_months: int, today: date | None = None) -> list[str]:
+    cutoff = add_months(month_start(today or datetime.utcnow().date()), -keep_months)
+    dropped = []
+    for part in list_partitions(cur, table):
+        suffix = part[len(table) + 2 :]
+        if not part.startswith(f"{table}_p") or len(suffix) != 6 or not suffix.isdigit():
+            continue
+        if date(int(suffix[:4]), int(suffix[4:]), 1) < cutoff:
+            cur.execute(sql.SQL("DROP TABLE {};").format(sql.Identifier(part)))
+            dropped.append(part)
+    return dropped
+
+
+def drop_legacy_table(cur, table: str):
+    cur.execute(sql.SQL("DROP TABLE IF EXISTS {};").format(sql.Identifier(f"{table}_legacy")))
@@ -0,0 +1,86 @@
+SEARCH_CONFIG = "english"
+REFRESH_BATCH_DEFAULT = 500
+SNIPPET_CHARS = 20_000
+BODY_CHARS = 500_000
+TITLE_PATTERN = "(?i)<title[^>]*>([^<]*)</title>"
+
+SEARCH_VECTOR_SQL = """
+  setweight(to_tsvector('{config}', COALESCE(substring(dc.content from '{title_pattern}'), '')), 'A') ||
+  setweight(to_tsvector('{config}', regexp_replace(dc.url, '^https?://[^/]+/|[/_.-]+', ' ', 'g')), 'B') ||
+  setweight(to_tsvector('{config}', regexp_replace(left(COALESCE(dc.content, ''), {body_chars}), '<[^>]*>', ' ', 'g')), 'C')
+""".format(config=SEARCH_CONFIG, body_chars=BODY_CHARS, title_pattern=TITLE_PATTERN)
+
+
+def ensure_search_schema(cur):
+    cur.execute(
+        """
+        ALTER TABLE candidate_rk_document_content
+          ADD COLUMN IF NOT EXISTS search_vector tsvector,
+          ADD COLUMN IF NOT EXISTS search_hash TEXT;
+
+        CREATE INDEX IF NOT EXISTS idx_document_content_search_vector
+          ON candidate_rk_document_content USING GIN (search_vector);
+        """
+    )
+
+
+def refresh_search_batch(cur, batch_size: int = REFRESH_BATCH_DEFAULT) -> int:
+    cur.execute(
+        f"""
+        WITH todo AS (
+          SELECT url
+          FROM candidate_rk_document_content
+          WHERE content_hash IS NOT NULL
+            AND search_hash IS DISTINCT FROM content_hash
+          LIMIT %s
+          FOR UPDATE SKIP LOCKED
+        )
+        UPDATE candidate_rk_document_content dc
+        SET search_vector = {SEARCH_VECTOR_SQL},
+            search_hash = dc.content_hash
+        FROM todo
+        WHERE dc.url = todo.url;
+        """,
+        (batch_size,),
+    )
+    return cur.rowcount
+
+
+def refresh_search_index(conn, cur, batch_size: int = REFRESH_BATCH_DEFAULT) -> int:
+    total = 0
+    while True:
+        n = refresh_search_batch(cur, batch_size)
+        conn.commit()
+        total += n
+        if n < batch_size:
+            return total
+
+
+def search_documents(cur, query: str, limit: int = 20) -> list[dict]:
+    cur.execute(
+        f"""
+        WITH q AS (
+          SELECT websearch_to_tsquery('{SEARCH_CONFIG}', %(query)s) AS tsq
+        ),
+        hits AS (
+          SELECT dc.url, dc.content, ts_rank_cd(dc.search_vector, q.tsq) AS rank
+          FROM candidate_rk_document_content dc, q
+          WHERE dc.search_vector @@ q.tsq
+          ORDER BY rank DESC, dc.url
+          LIMIT %(limit)s
+        )
+        SELECT
+          hits.url,
+          hits.rank,
+          ts_headline(
+            '{SEARCH_CONFIG}',
+            regexp_replace(left(hits.content, {SNIPPET_CHARS}), '<[^>]*>', ' ', 'g'),
+            q.tsq,
+            'MaxFragments=2, MaxWords=25, MinWords=8'
+          ) AS snippet
+        FROM hits, q
+        ORDER BY hits.rank DESC, hits.url;
+        """,
+        {"query": query, "limit": limit},
+    )
+    return [{"url": row[0], "rank": float(row[1]), "snippet": row[2]} for row in cur.fetchall()]
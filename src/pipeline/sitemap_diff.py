@@ -0,0 +1,132 @@
+import hashlib
+import struct
+from datetime import datetime
+
+SNAPSHOT_PAIR = struct.Struct(">qq")
+URL_KEY_SQL = "('x' || substr(md5(url), 1, 16))::bit(64)::bigint"
+
+
+def url_key(url: str) -> int:
+    return int.from_bytes(hashlib.md5(url.encode("utf-8")).digest()[:8], "big", signed=True)
+
+
+def lastmod_key(lastmod: datetime | None) -> int:
+    return int(lastmod.timestamp()) if lastmod else 0
+
+
+def fingerprints(entries: dict) -> dict[int, int]:
+    return {url_key(url): lastmod_key(lastmod) for url, lastmod in entries.items()}
+
+
+def encode_snapshot(prints: dict[int, int]) -> bytes:
+    return b"".join(SNAPSHOT_PAIR.pack(k, v) for k, v in sorted(prints.items()))
+
+
+def decode_snapshot(data: bytes) -> dict[int, int]:
+    return dict(SNAPSHOT_PAIR.iter_unpack(bytes(data)))
+
+
+def ensure_discovery_schema(cur):
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS candidate_rk_sitemap_snapshots (
+          source TEXT PRIMARY KEY,
+          fingerprints BYTEA NOT NULL,
+          url_count INTEGER NOT NULL,
+          taken_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT NOW()
+        );
+
+        ALTER TABLE candidate_rk_sitemap_staging
+          ADD COLUMN IF NOT EXISTS removed_at TIMESTAMP WITHOUT TIME ZONE;
+
+        ALTER TABLE candidate_rk_docs_master
+          ADD COLUMN IF NOT EXISTS removed_at TIMESTAMP WITHOUT TIME ZONE;
+        """
+    )
+
+
+def load_snapshots(cur) -> dict[str, dict[int, int]]:
+    cur.execute(
+        """
+        SELECT source, fingerprints
+        FROM candidate_rk_sitemap_snapshots;
+        """
+    )
+    return {row[0]: decode_snapshot(row[1]) for row in cur.fetchall()}
+
+
+def save_snapshot(cur, source: str, prints: dict[int, int]):
+    cur.execute(
+        """
+        INSERT INTO candidate_rk_sitemap_snapshots (source, fingerprints, url_count, taken_at)
+        VALUES (%s, %s, %s, NOW())
+        ON CONFLICT (source) DO UPDATE SET
+          fingerprints = EXCLUDED.fingerprints,
+          url_count = EXCLUDED.url_count,
+          taken_at = EXCLUDED.taken_at;
+        """,
+        (source, encode_snapshot(prints), len(prints)),
+    )
+
+
+def delete_snapshots(cur, sources):
+    if not sources:
+        return
+    cur.execute(
+        "DELETE FROM candidate_rk_sitemap_snapshots WHERE source = ANY(%s);",
+        (sorted(sources),),
+    )
+
+
+def diff_source(previous: dict[int, int], entries: dict) -> dict:
+    added, changed = [], []
+    current_keys = set()
+    for url, lastmod in entries.items():
+        key = url_key(url)
+        current_keys.add(key)
+        if key not in previous:
+            added.append(url)
+        elif previous[key] != lastmod_key(lastmod):
+            changed.append(url)
+    return {"added": added, "changed": changed, "removed": set(previous) - current_keys}
+
+
+def mark_removed(cur, keys) -> int:
+    if not keys:
+        return 0
+    cur.execute(
+        f"""
+        UPDATE candidate_rk_sitemap_staging
+        SET removed_at = NOW()
+        WHERE removed_at IS NULL
+          AND {URL_KEY_SQL} = ANY(%s::bigint[]);
+        """,
+        (sorted(keys),),
+    )
+    return cur.rowcount
+
+
+def sync_discovery(cur, discovered: dict[str, dict], upsert_fn) -> dict:
+    previous = load_snapshots(cur)
+    current = {src: fingerprints(entries) for src, entries in discovered.items()}
+    still_listed = set().union(*current.values()) if current else set()
+    dropped_sources = set(previous) - set(discovered)
+
+    summary = {"added": 0, "changed": 0, "removed": 0, "unchanged": 0}
+    removed = set()
+    for src in dropped_sources:
+        removed |= diff_source(previous[src], {})["removed"]
+    for src, entries in discovered.items():
+        d = diff_source(previous.get(src, {}), entries)
+        for url in d["added"] + d["changed"]:
+            upsert_fn(cur, url, src, entries[url])
+        removed |= d["removed"]
+        summary["added"] += len(d["added"])
+        summary["changed"] += len(d["changed"])
+        summary["unchanged"] += len(entries) - len(d["added"]) - len(d["changed"])
+
+    summary["removed"] = mark_removed(cur, removed - still_listed)
+    delete_snapshots(cur, dropped_sources)
+    for src, prints in current.items():
+        save_snapshot(cur, src, prints)
+    return summary
@@ -0,0 +1,242 @@
+import gzip
+import mmap
+import uuid
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+from urllib.parse import urljoin
+
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+WARC_VERSION = "WARC/1.1"
+MAX_FILE_BYTES_DEFAULT = 100 * 1024 * 1024
+INDEX_READ_STEP = 64 * 1024
+DROPPED_HEADERS = ("content-encoding", "transfer-encoding", "content-length")
+
+
+class ArchiveMiss(LookupError):
+    pass
+
+
+def _warc_date() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _record_bytes(headers: dict, block: bytes) -> bytes:
+    head = [WARC_VERSION]
+    head += [f"{k}: {v}" for k, v in headers.items()]
+    head.append(f"Content-Length: {len(block)}")
+    return ("\r\n".join(head) + "\r\n\r\n").encode("utf-8") + block + b"\r\n\r\n"
+
+
+def _http_block(status: int, reason: str | None, headers, body: bytes) -> bytes:
+    lines = [f"HTTP/1.1 {status} {reason or ''}".rstrip()]
+    for k, v in (headers or {}).items():
+        if k.lower() not in DROPPED_HEADERS:
+            lines.append(f"{k}: {v}")
+    lines.append(f"Content-Length: {len(body)}")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("utf-8") + body
+
+
+class WarcWriter:
+    def __init__(self, directory, *, prefix: str = "rk-ingest", max_file_bytes: int = MAX_FILE_BYTES_DEFAULT):
+        self.directory = Path(directory)
+        self.prefix = prefix
+        self.max_file_bytes = max_file_bytes
+        self.path = None
+        self.fh = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self.fh is not None:
+            self.fh.close()
+            self.fh = None
+
+    def _rotate(self):
+        self.close()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S%f")
+        self.path = self.directory / f"{self.prefix}-{stamp}.warc.gz"
+        self.fh = open(self.path, "ab")
+        info = f"software: rk-doc-ingestor\r\nformat: {WARC_VERSION}\r\n".encode("utf-8")
+        self._write_member(
+            {
+                "WARC-Type": "warcinfo",
+                "WARC-Record-ID": f"<urn:uuid:{uuid.uuid4()}>",
+                "WARC-Date": _warc_date(),
+                "WARC-Filename": self.path.name,
+                "Content-Type": "application/warc-fields",
+            },
+            info,
+        )
+
+    def _write_member(self, headers: dict, block: bytes):
+        self.fh.write(gzip.compress(_record_bytes(headers, block)))
+        self.fh.flush()
+
+    def write_response(self, url: str, status: int, reason: str | None, headers, body: bytes, *, truncated: bool = False):
+        if self.fh is None or self.fh.tell() >= self.max_file_bytes:
+            self._rotate()
+        warc_headers = {
+            "WARC-Type": "response",
+            "WARC-Record-ID": f"<urn:uuid:{uuid.uuid4()}>",
+            "WARC-Date": _warc_date(),
+            "WARC-Target-URI": url,
+            "Content-Type": "application/http;msgtype=response",
+        }
+        if truncated:
+            warc_headers["WARC-Truncated"] = "length"
+        self._write_member(warc_headers, _http_block(status, reason, headers, body))
+
+    def record(self, r, body: bytes = b"", *, truncated: bool = False):
+        for hop in r.history or []:
+            self.write_response(hop.url, hop.status_code, hop.reason, hop.headers, b"")
+        self.write_response(r.url, r.status_code, r.reason, r.headers, body, truncated=truncated)
+
+
+def _split_head(data: bytes) -> tuple[bytes, bytes]:
+    head, _, rest = data.partition(b"\r\n\r\n")
+    return head, rest
+
+
+def _parse_fields(lines: list[bytes]) -> CaseInsensitiveDict:
+    fields = CaseInsensitiveDict()
+    for line in lines:
+        k, _, v = line.decode("utf-8", errors="replace").partition(":")
+        fields[k.strip()] = v.strip()
+    return fields
+
+
+def parse_record(data: bytes) -> dict | None:
+    head, rest = _split_head(data)
+    warc_headers = _parse_fields(head.split(b"\r\n")[1:])
+    if warc_headers.get("WARC-Type") != "response":
+        return None
+    block = rest[: int(warc_headers["Content-Length"])]
+    http_head, body = _split_head(block)
+    status_line, *header_lines = http_head.split(b"\r\n")
+    parts = status_line.decode("utf-8").split(" ", 2)
+    return {
+        "url": warc_headers["WARC-Target-URI"],
+        "status": int(parts[1]),
+        "reason": parts[2] if len(parts) > 2 else "",
+        "headers": _parse_fields(header_lines),
+        "body": body,
+    }
+
+
+def iter_members(path: Path, step: int = INDEX_READ_STEP):
+    with open(path, "rb") as fh:
+        if path.stat().st_size == 0:
+            return
+        with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            view = memoryview(mm)
+            try:
+                offset = 0
+                while offset < len(view):
+                    d = zlib.decompressobj(wbits=31)
+                    chunks = []
+                    pos = offset
+                    while not d.eof and pos < len(view):
+                        window = view[pos : pos + step]
+                        chunks.append(d.decompress(window))
+                        pos += len(window)
+                        window.release()
+                    if not d.eof:
+                        break
+                    end = pos - len(d.unused_data)
+                    yield offset, end - offset, b"".join(chunks)
+                    offset = end
+            finally:
+                view.release()
+
+
+class WarcArchive:
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.index = {}
+        for path in sorted(self.directory.glob("*.warc.gz")):
+            for offset, length, raw in iter_members(path):
+                rec = parse_record(raw)
+                if rec is None:
+                    continue
+                kind = "not_modified" if rec["status"] == 304 else "entity"
+                self.index.setdefault(rec["url"], {})[kind] = (path, offset, length)
+
+    def __len__(self):
+        return len(self.index)
+
+    def _load(self, loc) -> dict:
+        path, offset, length = loc
+        with open(path, "rb") as fh:
+            fh.seek(offset)
+            return parse_record(gzip.decompress(fh.read(length)))
+
+    def lookup(self, url: str, request_headers=None) -> dict:
+        entry = self.index.get(url)
+        if not entry:
+            raise ArchiveMiss(f"{url} is not in {self.directory}")
+        request_headers = CaseInsensitiveDict(request_headers or {})
+        conditional = "If-None-Match" in request_headers or "If-Modified-Since" in request_headers
+
+        if "entity" in entry:
+            rec = self._load(entry["entity"])
+            etag, lm = rec["headers"].get("ETag"), rec["headers"].get("Last-Modified")
+            if rec["status"] == 200 and conditional and (
+                (etag and request_headers.get("If-None-Match") == etag)
+                or (lm and request_headers.get("If-Modified-Since") == lm)
+            ):
+                return {**rec, "status": 304, "reason": "Not Modified", "body": b""}
+            return rec
+        if conditional:
+            return self._load(entry["not_modified"])
+        raise ArchiveMiss(f"{url} was only recorded as 304 in {self.directory}")
+
+
+class ReplayResponse:
+    def __init__(self, rec: dict, history: list):
+        self.url = rec["url"]
+        self.status_code = rec["status"]
+        self.reason = rec["reason"]
+        self.headers = rec["headers"]
+        self.history = history
+        self.encoding = get_encoding_from_headers(self.headers)
+        self._body = rec["body"]
+
+    def iter_content(self, chunk_size: int = 8192):
+        for i in range(0, len(self._body), chunk_size):
+            yield self._body[i : i + chunk_size]
+
+    def close(self):
+        pass
+
+
+class ReplaySession:
+    def __init__(self, archive: WarcArchive, max_redirects: int = 30):
+        self.archive = archive
+        self.max_redirects = max_redirects
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        pass
+
+    def get(self, url: str, *, headers=None, allow_redirects: bool = True, **_):
+        history = []
+        rec = self.archive.lookup(url, headers)
+        while allow_redirects and rec["status"] in (301, 302, 303, 307, 308) and rec["headers"].get("Location"):
+            if len(history) >= self.max_redirects:
+                raise ArchiveMiss(f"Too many redirects recorded for {url}")
+            history.append(ReplayResponse(rec, []))
+            rec = self.archive.lookup(urljoin(rec["url"], rec["headers"]["Location"]), headers)
+        return ReplayResponse(rec, history)
@@ -1,10 +1,17 @@
-import os
 from datetime import datetime
+from pathlib import Path
+import sys
 import requests
 from lxml import etree
-import psycopg2
 from dotenv import load_dotenv
 
+SRC_ROOT = Path(__file__).resolve().parents[1]
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from pipeline.db import connect_db
+from pipeline.sitemap_diff import ensure_discovery_schema, sync_discovery
+
 load_dotenv()
 
 SITEMAP_URLS = [
@@ -12,15 +19,6 @@ SITEMAP_URLS = [
     "https://other-docs.snowflake.com/en/sitemap.xml",
 ]
 
-def db_connection():
-    return psycopg2.connect(
-        host=os.getenv("DB_HOST"),
-        port=int(os.getenv("DB_PORT", "5432")),
-        dbname=os.getenv("DB_NAME"),
-        user=os.getenv("DB_USER"),
-        password=os.getenv("DB_PASSWORD"),
-    )
-
 def clean_text(s: str):
     if s is None:
         return None
@@ -58,12 +56,13 @@ def upsert_row(cur, url: str, source: str, lastmod):
         ON CONFLICT (url)
         DO UPDATE SET
           source = EXCLUDED.source,
-          lastmod = COALESCE(EXCLUDED.lastmod, candidate_rk_sitemap_staging.lastmod);
+          lastmod = COALESCE(EXCLUDED.lastmod, candidate_rk_sitemap_staging.lastmod),
+          removed_at = NULL;
         """,
         (url, source, lastmod),
     )
 
-def process_sitemap(sitemap_url: str, visited: set, cur):
+def process_sitemap(sitemap_url: str, visited: set, discovered: dict):
     sitemap_url = clean_text(sitemap_url)
     if sitemap_url in visited:
         return
@@ -77,24 +76,35 @@ def process_sitemap(sitemap_url: str, visited: set, cur):
             "//*[local-name()='sitemap']/*[local-name()='loc']/text()"
         )
         for child in child_sitemaps:
-            process_sitemap(child, visited, cur)
+            process_sitemap(child, visited, discovered)
     else:
         src = sitemap_url  # source = which sitemap file it came from
         urls = root.xpath("//*[local-name()='url']/*[local-name()='loc']/text()")
         lastmods = root.xpath("//*[local-name()='url']/*[local-name()='lastmod']/text()")
 
+        entries = discovered.setdefault(src, {})
         for i, doc_url in enumerate(urls):
             lastmod_text = lastmods[i] if i < len(lastmods) else None
-            upsert_row(cur, doc_url, src, parse_lastmod(clean_text(lastmod_text)))
+            doc_url = clean_text(doc_url)
+            if doc_url and doc_url.startswith("http"):
+                entries[doc_url] = parse_lastmod(clean_text(lastmod_text))
 
 def main():
     visited = set()
-    with db_connection() as conn:
+    discovered = {}
+    for s in SITEMAP_URLS:
+        process_sitemap(s, visited, discovered)
+
+    with connect_db() as conn:
         with conn.cursor() as cur:
-            for s in SITEMAP_URLS:
-                process_sitemap(s, visited, cur)
+            ensure_discovery_schema(cur)
+            summary = sync_discovery(cur, discovered, upsert_row)
         conn.commit()
     print(f"Done. Visited {len(visited)} sitemap files.")
+    print(
+        f"Added {summary['added']}, changed {summary['changed']}, "
+        f"removed {summary['removed']}, unchanged {summary['unchanged']} URLs."
+    )
 
 if __name__ == "__main__":
     main()
@@ -1,9 +1,10 @@
-INSERT INTO candidate_rk_docs_master (url, sources, first_seen_at, last_seen_at)
+INSERT INTO candidate_rk_docs_master (url, sources, first_seen_at, last_seen_at, removed_at)
 SELECT
   s.url,
   ARRAY_AGG(DISTINCT s.source ORDER BY s.source) FILTER (WHERE s.source IS NOT NULL) AS sources,
   MIN(s.discovered_at) AS first_seen_at,
-  MAX(s.discovered_at) AS last_seen_at
+  MAX(s.discovered_at) AS last_seen_at,
+  CASE WHEN BOOL_AND(s.removed_at IS NOT NULL) THEN MAX(s.removed_at) END AS removed_at
 FROM candidate_rk_sitemap_staging s
 GROUP BY s.url
 ON CONFLICT (url)
@@ -17,4 +18,11 @@ DO UPDATE SET
     )
   ),
   first_seen_at = LEAST(candidate_rk_docs_master.first_seen_at, EXCLUDED.first_seen_at),
-  last_seen_at  = GREATEST(candidate_rk_docs_master.last_seen_at, EXCLUDED.last_seen_at);
+  last_seen_at  = GREATEST(candidate_rk_docs_master.last_seen_at, EXCLUDED.last_seen_at),
+  removed_at = EXCLUDED.removed_at
+WHERE NOT (EXCLUDED.sources <@ COALESCE(candidate_rk_docs_master.sources, '{}'))
+   OR LEAST(candidate_rk_docs_master.first_seen_at, EXCLUDED.first_seen_at)
+        IS DISTINCT FROM candidate_rk_docs_master.first_seen_at
+   OR GREATEST(candidate_rk_docs_master.last_seen_at, EXCLUDED.last_seen_at)
+        IS DISTINCT FROM candidate_rk_docs_master.last_seen_at
+   OR EXCLUDED.removed_at IS DISTINCT FROM candidate_rk_docs_master.removed_at;
@@ -5,9 +5,20 @@ SRC_ROOT = Path(__file__).resolve().parents[1]
 if str(SRC_ROOT) not in sys.path:
     sys.path.insert(0, str(SRC_ROOT))
 
-from pipeline.ingest import run_content_ingest
+from pipeline.db import connect_db
+from pipeline.ingest import ensure_ingest_schema, run_content_ingest
+from pipeline.search import ensure_search_schema, refresh_search_index
 
 
 if __name__ == "__main__":
+    with connect_db() as conn, conn.cursor() as cur:
+        ensure_ingest_schema(cur)
+        conn.commit()
+
     stats = run_content_ingest()
     print(stats)
+
+    with connect_db() as conn, conn.cursor() as cur:
+        ensure_search_schema(cur)
+        conn.commit()
+        print(f"Search index refreshed for {refresh_search_index(conn, cur)} documents.")
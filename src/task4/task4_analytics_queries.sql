@@ -53,3 +53,16 @@ FROM
 CROSS JOIN
     (SELECT COUNT(*) AS total_count
      FROM candidate_rk_docs_master) total;
+
+-- name: redirect_chains
+SELECT
+    rd.source_url,
+    rd.final_url,
+    rd.status_code,
+    CARDINALITY(rd.hops) + 1 AS hop_count,
+    rd.hops AS intermediate_urls,
+    COUNT(*) OVER (PARTITION BY rd.final_url) AS sources_sharing_target,
+    rd.first_seen_at,
+    rd.last_confirmed_at
+FROM candidate_rk_url_redirects rd
+ORDER BY hop_count DESC, sources_sharing_target DESC, rd.source_url;
@@ -0,0 +1,106 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from pipeline.anomaly import RunMonitor, failure_rate_alerts, load_policy
+from pipeline.ingest import run_content_ingest
+
+
+def test_failure_rate_alerts_match_post_run_thresholds():
+    assert failure_rate_alerts(0, 0, None) == []
+    assert failure_rate_alerts(10, 3, None)[0]["severity"] == "critical"
+    assert failure_rate_alerts(10, 2, None) == []
+    assert failure_rate_alerts(20, 3, None)[0]["severity"] == "warning"
+
+    baseline = {"avg_error_rate": 0.02, "sample_count": 5}
+    assert failure_rate_alerts(10, 1, baseline)[0]["message"] == "Failure rate is more than 2x recent baseline."
+
+
+def test_policy_can_be_overridden_and_is_validated(monkeypatch):
+    monkeypatch.setenv("INGEST_ANOMALY_LATENCY", "ignore")
+    assert load_policy()["latency"] == "ignore"
+    assert load_policy({"critical_failure_rate": "slow_down"})["critical_failure_rate"] == "slow_down"
+    with pytest.raises(ValueError):
+        load_policy({"latency": "panic"})
+
+
+def test_monitor_pauses_failing_host_and_flags_latency():
+    monitor = RunMonitor({"avg_request_ms": 100.0, "sample_count": 5}, {"critical_failure_rate": "abort"})
+
+    fired = []
+    for _ in range(10):
+        fired += monitor.observe("down.example.com", True, 50.0)
+    assert [a["action"] for a in fired] == ["pause_host"]
+    assert fired[0]["details"]["host"] == "down.example.com"
+
+    slow = []
+    for _ in range(40):
+        slow += monitor.observe("slow.example.com", False, 2_000.0)
+    assert any(a["rule"] == "latency" and a["action"] == "slow_down" for a in slow)
+
+
+@patch("pipeline.ingest.requests.Session")
+@patch("pipeline.ingest.connect_db")
+def test_ingest_aborts_early_when_most_requests_fail(connect_db_mock, session_mock):
+    conn = MagicMock()
+    cur = MagicMock()
+    conn.__enter__.return_value = conn
+    conn.cursor.return_value.__enter__.return_value = cur
+    connect_db_mock.return_value = conn
+
+    rows = [{"url": f"https://h{i}.example.com/x", "etag": None, "last_modified": None} for i in range(100)]
+    cur.fetchall.side_effect = [rows, []]
+
+    s = MagicMock()
+    session_mock.return_value.__enter__.return_value = s
+    r = MagicMock()
+    r.status_code = 404
+    r.headers = {}
+    s.get.return_value = r
+
+    stats = run_content_ingest(batch_size=100, host_delay=0.0)
+
+    assert stats["aborted"] is True
+    assert stats["processed"] == 20
+    assert stats["fetch_count"] == 20
+    assert stats["fetch_ms"] >= 0
+    assert stats["anomalies"][-1]["action"] == "abort"
+    assert conn.commit.called
+
+
+@patch("pipeline.ingest.host_throttle_sleep")
+@patch("pipeline.ingest.requests.Session")
+@patch("pipeline.ingest.connect_db")
+def test_slow_down_is_per_host_and_relaxes_when_healthy(connect_db_mock, session_mock, throttle_mock):
+    conn = MagicMock()
+    cur = MagicMock()
+    conn.__enter__.return_value = conn
+    conn.cursor.return_value.__enter__.return_value = cur
+    connect_db_mock.return_value = conn
+
+    def rows(prefix, n):
+        return [{"url": f"https://{prefix}-{i}", "etag": None, "last_modified": None} for i in range(n)]
+
+    cur.fetchall.side_effect = [
+        rows("bad.example.com/missing", 20),
+        rows("good.example.com/page", 5),
+        rows("bad.example.com/page", 20),
+        [],
+    ]
+
+    s = MagicMock()
+    session_mock.return_value.__enter__.return_value = s
+    missing = MagicMock(status_code=404, headers={})
+    ok = MagicMock(status_code=200, headers={}, history=[], encoding="utf-8")
+    ok.iter_content.return_value = [b"ok"]
+    s.get.side_effect = lambda url, **_: missing if "/missing-" in url else ok
+
+    policy = {"critical_failure_rate": "slow_down", "host_failure_rate": "ignore"}
+    stats = run_content_ingest(batch_size=20, host_delay=0.0, anomaly_policy=policy)
+
+    assert [a["action"] for a in stats["anomalies"]] == ["slow_down"]
+    delays = [(c[0][1], c[0][2]) for c in throttle_mock.call_args_list]
+    assert all(d == 0.0 for h, d in delays if h == "good.example.com")
+    bad = [d for h, d in delays if h == "bad.example.com"]
+    assert bad[20] == 0.5
+    assert bad[-1] == 0.0
@@ -0,0 +1,75 @@
+from unittest.mock import MagicMock, patch
+
+import requests
+
+from pipeline.breaker import CLOSED, HALF_OPEN, OPEN, HostCircuitBreaker
+from pipeline.ingest import run_content_ingest
+
+
+def test_breaker_opens_half_opens_and_closes():
+    clock = {"t": 0.0}
+    breaker = HostCircuitBreaker(failure_threshold=2, reset_timeout=10.0, now_fn=lambda: clock["t"])
+
+    breaker.record("h", {"status": None, "err": "Timeout: slow"})
+    assert breaker.state("h") == CLOSED
+    breaker.record("h", {"status": 503, "err": "HTTP 503"})
+    assert breaker.state("h") == OPEN
+    assert not breaker.allow("h")
+    assert breaker.open_hosts() == ["h"]
+
+    clock["t"] = 10.0
+    assert breaker.state("h") == HALF_OPEN
+    assert breaker.allow("h")
+
+    breaker.record("h", {"status": None, "err": "ConnectionError: refused"})
+    assert breaker.state("h") == OPEN
+
+    clock["t"] = 20.0
+    breaker.record("h", {"status": 404, "err": "HTTP 404"})
+    assert breaker.state("h") == CLOSED
+
+
+@patch("pipeline.http.time.sleep")
+@patch("pipeline.ingest.requests.Session")
+@patch("pipeline.ingest.connect_db")
+def test_failing_host_urls_are_deferred_not_upserted(connect_db_mock, session_mock, _sleep):
+    conn = MagicMock()
+    cur = MagicMock()
+    conn.__enter__.return_value = conn
+    conn.cursor.return_value.__enter__.return_value = cur
+    connect_db_mock.return_value = conn
+
+    rows = [{"url": f"https://Down.Example.com/{i}", "etag": None, "last_modified": None} for i in range(5)]
+    healthy = [{"url": "https://up.example.com/a", "etag": None, "last_modified": None}]
+    cur.fetchall.side_effect = [rows, healthy, []]
+
+    s = MagicMock()
+    session_mock.return_value.__enter__.return_value = s
+    ok = MagicMock()
+    ok.status_code = 200
+    ok.headers = {}
+    ok.history = []
+    ok.encoding = "utf-8"
+    ok.iter_content.return_value = [b"ok"]
+
+    def get(url, **_):
+        if "down.example.com" in url:
+            raise requests.ConnectionError("refused")
+        return ok
+
+    s.get.side_effect = get
+
+    stats = run_content_ingest(batch_size=5, host_delay=0.0, breaker_failure_threshold=2)
+
+    assert stats["processed"] == 3
+    assert stats["err"] == 2
+    assert stats["ok200"] == 1
+    assert stats["deferred"] == 3
+    assert stats["deferred_hosts"] == ["down.example.com"]
+    assert s.get.call_count == 2 * 4 + 1
+    upserted = [c for c in cur.execute.call_args_list if "INSERT INTO candidate_rk_document_content" in c[0][0]]
+    assert len(upserted) == 3
+
+    picks = [c[0][1] for c in cur.execute.call_args_list if "FROM candidate_rk_docs_master" in c[0][0]]
+    assert picks[1][0] == ["down.example.com"]
+    assert sorted(picks[1][1]) == [r["url"] for r in rows[2:]]
@@ -0,0 +1,118 @@
+import sqlite3
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+
+from pipeline.budget import RunBudget
+from pipeline.db import PICK_PRIORITY_SQL
+from pipeline.ingest import run_content_ingest
+
+
+def test_budget_sizes_batches_from_observed_throughput():
+    clock = {"t": 0.0}
+    budget = RunBudget(datetime.utcnow() + timedelta(seconds=100.5), now_fn=lambda: clock["t"], alpha=1.0)
+
+    assert budget.batch_size(500) == 90
+    budget.observe("slow.example.com", 10.0)
+    budget.observe("fast.example.com", 0.5)
+    assert budget.estimate("fast.example.com") == 0.5
+    assert budget.batch_size(500) == 180
+
+    clock["t"] = 95.0
+    assert budget.can_fit("fast.example.com")
+    budget.observe("fast.example.com", 0.5)
+    clock["t"] = 100.5
+    assert not budget.can_fit("slow.example.com")
+    assert budget.batch_size(500) == 0
+
+
+def test_pick_batch_prioritises_new_then_stale_failures_then_changed():
+    db = sqlite3.connect(":memory:")
+    db.executescript(
+        """
+        CREATE TABLE dm (url TEXT);
+        CREATE TABLE dc (url TEXT, status_code INTEGER, fetched_at TEXT, last_checked_at TEXT);
+        CREATE TABLE ss (url TEXT, lastmod TEXT);
+        """
+    )
+    db.executemany("INSERT INTO dm VALUES (?)", [(u,) for u in ("new", "old_404", "fresh_404", "changed", "aged")])
+    db.executemany(
+        "INSERT INTO dc VALUES (?, ?, ?, ?)",
+        [
+            ("old_404", 404, None, "2024-01-01 08:00:00"),
+            ("fresh_404", 404, None, "2024-01-01 11:30:00"),
+            ("changed", 200, "2024-01-01 00:00:00", "2024-01-01 00:00:00"),
+            ("aged", 200, "2023-12-30 00:00:00", "2023-12-30 00:00:00"),
+        ],
+    )
+    db.execute("INSERT INTO ss VALUES ('changed', '2024-01-01 06:00:00')")
+
+    priority = PICK_PRIORITY_SQL.format(retry_errors_before="?")
+    rows = db.execute(
+        f"""
+        SELECT dm.url
+        FROM dm LEFT JOIN dc ON dc.url = dm.url LEFT JOIN ss ON ss.url = dm.url
+        ORDER BY {priority} DESC, COALESCE(dc.last_checked_at, '1970-01-01') ASC
+        """,
+        ("2024-01-01 11:00:00",),
+    ).fetchall()
+
+    assert [r[0] for r in rows] == ["new", "old_404", "changed", "aged", "fresh_404"]
+
+
+@patch("pipeline.ingest.requests.Session")
+@patch("pipeline.ingest.connect_db")
+def test_expired_deadline_stops_before_fetching(connect_db_mock, session_mock):
+    conn = MagicMock()
+    cur = MagicMock()
+    conn.__enter__.return_value = conn
+    conn.cursor.return_value.__enter__.return_value = cur
+    connect_db_mock.return_value = conn
+    cur.fetchall.return_value = [{"url": "https://example.com/a", "etag": None, "last_modified": None}]
+
+    s = MagicMock()
+    session_mock.return_value.__enter__.return_value = s
+
+    stats = run_content_ingest(deadline=datetime.utcnow() - timedelta(seconds=1))
+
+    assert stats["deadline_reached"] is True
+    assert stats["processed"] == 0
+    assert s.get.call_count == 0
+
+
+@patch("pipeline.ingest.requests.Session")
+@patch("pipeline.ingest.connect_db")
+def test_rows_checked_in_this_run_are_not_picked_again(connect_db_mock, session_mock):
+    conn = MagicMock()
+    cur = MagicMock()
+    conn.__enter__.return_value = conn
+    conn.cursor.return_value.__enter__.return_value = cur
+    connect_db_mock.return_value = conn
+
+    rows = [{"url": f"https://example.com/{i}", "etag": '"v1"', "last_modified": None} for i in range(3)]
+    checked = {}
+    picks = []
+
+    def execute(sql, params=None):
+        if "INSERT INTO candidate_rk_document_content" in sql:
+            checked[params["url"]] = params["lca"]
+        elif "FROM candidate_rk_docs_master" in sql:
+            picks.append(params)
+            assert len(picks) <= 3, "ingest kept re-picking rows it already checked"
+
+    def fetchall():
+        checked_before = picks[-1][3]
+        return [r for r in rows if checked.get(r["url"]) is None or checked[r["url"]] < checked_before]
+
+    cur.execute.side_effect = execute
+    cur.fetchall.side_effect = fetchall
+
+    s = MagicMock()
+    session_mock.return_value.__enter__.return_value = s
+    s.get.return_value = MagicMock(status_code=304, headers={}, history=[])
+
+    stats = run_content_ingest(batch_size=3, host_delay=0.0, deadline=datetime.utcnow() + timedelta(minutes=5))
+
+    assert stats["ok304"] == 3
+    assert s.get.call_count == 3
+    assert len(picks) == 2
+    assert stats["deadline_reached"] is False
@@ -0,0 +1,62 @@
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+from pipeline.db import pick_batch, upsert_document_content
+
+
+def _payload():
+    return {
+        "url": "https://example.com/a",
+        "etag": None,
+        "lm": None,
+        "ch": None,
+        "c": None,
+        "cb": None,
+        "ct": None,
+        "sc": 304,
+        "fa": None,
+        "lca": None,
+        "err": None,
+        "wt": False,
+        "tl": False,
+    }
+
+
+def test_pick_batch_prepares_once_per_connection():
+    cur = MagicMock()
+    cur.connection = SimpleNamespace(prepared_statements=set())
+    cur.fetchall.return_value = []
+
+    pick_batch(cur, 10)
+    pick_batch(cur, 10)
+
+    sqls = [c[0][0] for c in cur.execute.call_args_list]
+    assert sum(s.startswith("PREPARE rk_pick_batch") for s in sqls) == 1
+    assert sqls.count("EXECUTE rk_pick_batch (%s, %s, %s, %s, %s);") == 2
+
+
+def test_upsert_uses_prepared_statement_with_positional_params():
+    cur = MagicMock()
+    cur.connection = SimpleNamespace(prepared_statements=set())
+
+    upsert_document_content(cur, _payload())
+
+    prepare_sql = cur.execute.call_args_list[0][0][0]
+    assert prepare_sql.startswith("PREPARE rk_upsert_document_content AS")
+    assert "$13" in prepare_sql
+    execute_args = cur.execute.call_args_list[1][0]
+    assert execute_args[0].startswith("EXECUTE rk_upsert_document_content")
+    assert execute_args[1][0] == "https://example.com/a"
+    assert len(execute_args[1]) == 13
+
+
+def test_plain_connection_falls_back_to_text_sql():
+    cur = MagicMock()
+    cur.connection = object()
+
+    upsert_document_content(cur, _payload())
+
+    assert cur.execute.call_count == 1
+    sql, params = cur.execute.call_args[0]
+    assert "%(url)s" in sql
+    assert params["url"] == "https://example.com/a"
@@ -0,0 +1,34 @@
+import json
+
+from pipeline.profiling import RunProfiler, profiling_enabled
+
+
+def test_profiling_enabled_by_flag_env_or_sample(monkeypatch):
+    monkeypatch.delenv("INGEST_PROFILE", raising=False)
+    monkeypatch.delenv("INGEST_PROFILE_SAMPLE_RATE", raising=False)
+    assert not profiling_enabled()
+    assert profiling_enabled(True)
+
+    monkeypatch.setenv("INGEST_PROFILE_SAMPLE_RATE", "0.1")
+    assert profiling_enabled(rand_fn=lambda: 0.05)
+    assert not profiling_enabled(rand_fn=lambda: 0.5)
+
+    monkeypatch.setenv("INGEST_PROFILE", "1")
+    assert profiling_enabled(rand_fn=lambda: 0.5)
+
+
+def test_profiler_saves_artifacts_under_metric_id(tmp_path):
+    with RunProfiler() as profiler:
+        blob = [str(i) * 10 for i in range(2000)]
+        profiler.record_request("a.example.com", "https://a.example.com/1", profiler.t0, 0.120, 200)
+        profiler.record_request("a.example.com", "https://a.example.com/2", profiler.t0 + 0.2, 0.080, 304)
+    del blob
+
+    summary = profiler.save(tmp_path, 42)
+
+    out = tmp_path / "42"
+    assert {p.name for p in out.iterdir()} == {"cpu.pstats", "cpu_top.txt", "alloc.tracemalloc", "timeline.json"}
+    assert len(json.loads((out / "timeline.json").read_text())) == 2
+    assert summary["host_summary"]["a.example.com"] == {"requests": 2, "total_ms": 200.0, "max_ms": 120.0, "avg_ms": 100.0}
+    assert summary["peak_traced_bytes"] > 0
+    assert summary["cpu_top"]
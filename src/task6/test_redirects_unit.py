@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+
+from pipeline.ingest import run_content_ingest
+from pipeline.redirects import canonicalize_url, known_target
+
+
+def test_canonicalize_url_normalizes_host_port_and_fragment():
+    assert canonicalize_url("HTTPS://Docs.Example.com:443#top") == "https://docs.example.com/"
+    assert canonicalize_url("http://example.com:8080/a?b=1") == "http://example.com:8080/a?b=1"
+
+
+def test_known_target_only_for_fresh_permanent_redirects():
+    now = datetime(2024, 1, 10)
+    row = {
+        "url": "https://example.com/old",
+        "redirect_url": "https://example.com/new",
+        "redirect_status": 301,
+        "redirect_confirmed_at": now - timedelta(days=1),
+    }
+    assert known_target(row, now) == "https://example.com/new"
+    assert known_target({**row, "redirect_status": 302}, now) is None
+    assert known_target({**row, "redirect_confirmed_at": now - timedelta(days=30)}, now) is None
+    assert known_target({"url": "https://example.com/old"}, now) is None
+
+
+@patch("pipeline.ingest.requests.Session")
+@patch("pipeline.ingest.connect_db")
+def test_urls_sharing_a_known_target_are_fetched_once(connect_db_mock, session_mock):
+    conn = MagicMock()
+    cur = MagicMock()
+    conn.__enter__.return_value = conn
+    conn.cursor.return_value.__enter__.return_value = cur
+    connect_db_mock.return_value = conn
+
+    fresh = datetime.utcnow()
+    rows = [
+        {
+            "url": f"https://example.com/old-{i}",
+            "etag": None,
+            "last_modified": None,
+            "redirect_url": "https://example.com/new",
+            "redirect_status": 308,
+            "redirect_confirmed_at": fresh,
+        }
+        for i in range(3)
+    ]
+    cur.fetchall.side_effect = [rows, []]
+
+    s = MagicMock()
+    session_mock.return_value.__enter__.return_value = s
+    r = MagicMock()
+    r.status_code = 200
+    r.headers = {"Content-Type": "text/html"}
+    r.iter_content.return_value = [b"hello"]
+    r.encoding = "utf-8"
+    r.history = []
+    s.get.return_value = r
+
+    stats = run_content_ingest(batch_size=3, host_delay=0.0)
+
+    assert s.get.call_count == 1
+    assert s.get.call_args[0][0] == "https://example.com/new"
+    assert stats["processed"] == 3
+    assert stats["ok200"] == 3
+    assert stats["collapsed"] == 2
+
+
+@patch("pipeline.ingest.connect_db")
+def test_ingest_runs_no_schema_ddl_inside_its_transaction(connect_db_mock):
+    conn = MagicMock()
+    cur = MagicMock()
+    conn.__enter__.return_value = conn
+    conn.cursor.return_value.__enter__.return_value = cur
+    connect_db_mock.return_value = conn
+    cur.fetchall.return_value = []
+
+    run_content_ingest()
+
+    statements = [str(c[0][0]) for c in cur.execute.call_args_list]
+    assert not any("candidate_rk_url_redirects (" in sql for sql in statements)
+    assert not any("ADD COLUMN" in sql for sql in statements)
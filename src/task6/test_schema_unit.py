@@ -0,0 +1,59 @@
+from datetime import date
+from unittest.mock import MagicMock
+
+from pipeline.schema import (
+    add_months,
+    drop_expired_partitions,
+    ensure_time_partitions,
+    partition_document_content,
+)
+
+
+def test_add_months_crosses_year_boundaries():
+    assert add_months(date(2024, 11, 1), 2) == date(2025, 1, 1)
+    assert add_months(date(2024, 1, 1), -1) == date(2023, 12, 1)
+
+
+def test_retention_drops_only_expired_month_partitions():
+    cur = MagicMock()
+    cur.fetchall.return_value = [
+        ("pipeline_metrics_default",),
+        ("pipeline_metrics_p202312",),
+        ("pipeline_metrics_p202401",),
+        ("pipeline_metrics_p202406",),
+    ]
+
+    dropped = drop_expired_partitions(cur, "pipeline_metrics", keep_months=5, today=date(2024, 6, 15))
+
+    assert dropped == ["pipeline_metrics_p202312"]
+
+
+def test_ensure_time_partitions_skips_unpartitioned_tables():
+    cur = MagicMock()
+    cur.fetchone.return_value = (False,)
+
+    ensure_time_partitions(cur, today=date(2024, 6, 15))
+
+    assert cur.execute.call_count == 2
+
+
+def test_content_migration_recreates_dependent_views_on_new_table():
+    cur = MagicMock()
+    cur.fetchone.return_value = (False,)
+    cur.fetchall.side_effect = [
+        [(1234, "mv_lastmod_per_url", "m", " SELECT dm.url FROM candidate_rk_document_content dc;")],
+        [("CREATE INDEX idx_mv_lastmod_per_url_url ON public.mv_lastmod_per_url USING btree (url)",)],
+        [("candidate_rk_document_content_pkey", "CREATE UNIQUE INDEX ...", True)],
+    ]
+
+    assert partition_document_content(cur, partitions=2)
+
+    statements = [repr(c[0][0]) for c in cur.execute.call_args_list]
+    drop = next(i for i, s in enumerate(statements) if "DROP " in s and "mv_lastmod_per_url" in s)
+    rename = next(i for i, s in enumerate(statements) if "RENAME TO" in s)
+    copy = next(i for i, s in enumerate(statements) if "INSERT INTO" in s)
+    create = next(i for i, s in enumerate(statements) if "AS " in s and "mv_lastmod_per_url" in s)
+    assert drop < rename < copy < create
+    assert "MATERIALIZED VIEW" in statements[create]
+    assert "FROM candidate_rk_document_content dc" in statements[create]
+    assert statements[create + 1].startswith("'CREATE INDEX idx_mv_lastmod_per_url_url")
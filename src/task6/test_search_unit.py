@@ -0,0 +1,46 @@
+import re
+from unittest.mock import MagicMock, PropertyMock
+
+from pipeline.search import (
+    SEARCH_VECTOR_SQL,
+    TITLE_PATTERN,
+    refresh_search_index,
+    search_documents,
+)
+
+
+def test_refresh_only_touches_changed_hashes_and_stops_on_short_batch():
+    conn = MagicMock()
+    cur = MagicMock()
+    type(cur).rowcount = PropertyMock(side_effect=[2, 2, 1])
+
+    total = refresh_search_index(conn, cur, batch_size=2)
+
+    assert total == 5
+    assert cur.execute.call_count == 3
+    sql = cur.execute.call_args[0][0]
+    assert "search_hash IS DISTINCT FROM content_hash" in sql
+    assert "search_hash = dc.content_hash" in sql
+    assert conn.commit.call_count == 3
+
+
+def test_search_documents_returns_ranked_hits():
+    cur = MagicMock()
+    cur.fetchall.return_value = [("https://example.com/a", 0.5, "a <b>policy</b> doc")]
+
+    hits = search_documents(cur, "masking policy", limit=5)
+
+    assert hits == [{"url": "https://example.com/a", "rank": 0.5, "snippet": "a <b>policy</b> doc"}]
+    sql, params = cur.execute.call_args[0]
+    assert "websearch_to_tsquery" in sql
+    assert "search_vector @@" in sql
+    assert params == {"query": "masking policy", "limit": 5}
+
+
+def test_title_pattern_stops_at_the_first_closing_title():
+    page = (
+        "<html><head><TITLE>Masking policies</TITLE></head><body><nav>Docs home</nav>"
+        "<svg><title>Copy icon</title></svg><p>body text</p></body></html>"
+    )
+    assert re.search(TITLE_PATTERN, page).group(1) == "Masking policies"
+    assert f"'{TITLE_PATTERN}'" in SEARCH_VECTOR_SQL
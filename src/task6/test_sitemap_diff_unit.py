@@ -0,0 +1,72 @@
+from datetime import datetime
+from unittest.mock import MagicMock
+
+from pipeline.sitemap_diff import (
+    decode_snapshot,
+    encode_snapshot,
+    fingerprints,
+    sync_discovery,
+    url_key,
+)
+
+SRC = "https://example.com/sitemap.xml"
+
+
+def test_snapshot_roundtrip_is_compact():
+    prints = fingerprints({"https://example.com/a": datetime(2024, 1, 1), "https://example.com/b": None})
+    data = encode_snapshot(prints)
+    assert len(data) == 16 * 2
+    assert decode_snapshot(data) == prints
+
+
+def test_sync_writes_only_deltas_and_marks_removed():
+    previous = {
+        "https://example.com/same": datetime(2024, 1, 1),
+        "https://example.com/changed": datetime(2024, 1, 1),
+        "https://example.com/gone": datetime(2024, 1, 1),
+    }
+    current = {
+        "https://example.com/same": datetime(2024, 1, 1),
+        "https://example.com/changed": datetime(2024, 2, 1),
+        "https://example.com/new": None,
+    }
+    cur = MagicMock()
+    cur.fetchall.return_value = [(SRC, encode_snapshot(fingerprints(previous)))]
+    cur.rowcount = 1
+    written = []
+
+    summary = sync_discovery(cur, {SRC: current}, lambda _cur, url, src, lm: written.append(url))
+
+    assert sorted(written) == ["https://example.com/changed", "https://example.com/new"]
+    assert summary == {"added": 1, "changed": 1, "removed": 1, "unchanged": 1}
+    update = next(c for c in cur.execute.call_args_list if "SET removed_at = NOW()" in c[0][0])
+    assert update[0][1] == ([url_key("https://example.com/gone")],)
+
+
+def test_url_moved_between_sources_is_not_removed():
+    other = "https://example.com/other-sitemap.xml"
+    cur = MagicMock()
+    cur.fetchall.return_value = [(SRC, encode_snapshot(fingerprints({"https://example.com/a": None})))]
+
+    summary = sync_discovery(cur, {SRC: {}, other: {"https://example.com/a": None}}, lambda *a: None)
+
+    assert summary["removed"] == 0
+    assert not any("SET removed_at = NOW()" in c[0][0] for c in cur.execute.call_args_list)
+
+
+def test_child_sitemap_dropped_from_index_marks_its_urls_removed():
+    dropped = "https://example.com/old-sitemap.xml"
+    cur = MagicMock()
+    cur.fetchall.return_value = [
+        (SRC, encode_snapshot(fingerprints({"https://example.com/a": None}))),
+        (dropped, encode_snapshot(fingerprints({"https://example.com/a": None, "https://example.com/b": None}))),
+    ]
+    cur.rowcount = 1
+
+    summary = sync_discovery(cur, {SRC: {"https://example.com/a": None}}, lambda *a: None)
+
+    assert summary["removed"] == 1
+    update = next(c for c in cur.execute.call_args_list if "SET removed_at = NOW()" in c[0][0])
+    assert update[0][1] == ([url_key("https://example.com/b")],)
+    delete = next(c for c in cur.execute.call_args_list if "DELETE FROM candidate_rk_sitemap_snapshots" in c[0][0])
+    assert delete[0][1] == ([dropped],)
@@ -0,0 +1,134 @@
+import os
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from pipeline.http import fetch_url
+from pipeline.ingest import run_content_ingest
+from pipeline.warc import ArchiveMiss, ReplaySession, WarcArchive, WarcWriter
+
+
+def _response(url, status, body=b"", headers=None, history=()):
+    r = MagicMock()
+    r.url = url
+    r.status_code = status
+    r.reason = "OK" if status == 200 else "Moved Permanently"
+    r.headers = headers or {}
+    r.history = list(history)
+    r.encoding = "utf-8"
+    r.iter_content.return_value = [body]
+    return r
+
+
+def test_recorded_fetch_replays_with_redirects_and_conditionals(tmp_path):
+    hop = _response("https://example.com/old", 301, headers={"Location": "/new"})
+    final = _response(
+        "https://example.com/new",
+        200,
+        b"<html>hello</html>",
+        {"Content-Type": "text/html; charset=utf-8", "ETag": '"v1"'},
+        [hop],
+    )
+    live = MagicMock()
+    live.get.return_value = final
+
+    with WarcWriter(tmp_path, max_file_bytes=1) as recorder:
+        recorded = fetch_url(live, "https://example.com/old", recorder=recorder)
+
+    assert len(list(tmp_path.glob("*.warc.gz"))) == 2
+
+    archive = WarcArchive(tmp_path)
+    replayed = fetch_url(ReplaySession(archive), "https://example.com/old")
+    assert replayed["status"] == 200
+    assert replayed["hash"] == recorded["hash"]
+    assert replayed["text"] == "<html>hello</html>"
+    assert replayed["final_url"] == "https://example.com/new"
+    assert replayed["redirects"] == [("https://example.com/old", 301)]
+
+    assert fetch_url(ReplaySession(archive), "https://example.com/new", etag='"v1"') == {"status": 304}
+
+    with pytest.raises(ArchiveMiss):
+        fetch_url(ReplaySession(archive), "https://example.com/missing")
+
+
+def test_archive_index_handles_thousands_of_records(tmp_path):
+    with WarcWriter(tmp_path) as w:
+        for i in range(5000):
+            w.write_response(f"https://example.com/{i}", 200, "OK", {}, os.urandom(2048))
+    assert len(list(tmp_path.glob("*.warc.gz"))) == 1
+
+    archive = WarcArchive(tmp_path)
+
+    assert len(archive) == 5000
+    assert archive.lookup("https://example.com/4999")["status"] == 200
+
+
+@patch("pipeline.ingest.connect_db")
+def test_ingest_replay_mode_reads_from_archive(connect_db_mock, tmp_path):
+    with WarcWriter(tmp_path) as w:
+        w.write_response("https://example.com/a", 200, "OK", {"Content-Type": "text/plain"}, b"archived")
+
+    conn = MagicMock()
+    cur = MagicMock()
+    conn.__enter__.return_value = conn
+    conn.cursor.return_value.__enter__.return_value = cur
+    connect_db_mock.return_value = conn
+    cur.fetchall.side_effect = [
+        [{"url": "https://example.com/a", "etag": None, "last_modified": None}],
+        [],
+    ]
+
+    stats = run_content_ingest(batch_size=1, http_mode="replay", warc_dir=tmp_path)
+
+    assert stats["ok200"] == 1
+    payload = next(
+        c[0][1] for c in cur.execute.call_args_list if "INSERT INTO candidate_rk_document_content" in c[0][0]
+    )
+    assert payload["c"] == "archived"
+
+
+@patch("pipeline.ingest.connect_db")
+def test_replay_miss_is_skipped_without_upsert(connect_db_mock, tmp_path):
+    with WarcWriter(tmp_path) as w:
+        w.write_response("https://example.com/a", 200, "OK", {"Content-Type": "text/plain"}, b"archived")
+
+    conn = MagicMock()
+    cur = MagicMock()
+    conn.__enter__.return_value = conn
+    conn.cursor.return_value.__enter__.return_value = cur
+    connect_db_mock.return_value = conn
+    cur.fetchall.side_effect = [
+        [{"url": "https://example.com/gone", "etag": None, "last_modified": None}],
+        [],
+    ]
+
+    stats = run_content_ingest(batch_size=1, http_mode="replay", warc_dir=tmp_path)
+
+    assert stats["replay_miss"] == 1
+    assert stats["processed"] == 0
+    assert stats["err"] == 0
+    assert not any("INSERT INTO" in c[0][0] for c in cur.execute.call_args_list)
+    picks = [c[0][1] for c in cur.execute.call_args_list if "FROM candidate_rk_docs_master" in c[0][0]]
+    assert picks[1][1] == ["https://example.com/gone"]
+
+
+@patch("pipeline.http.time.sleep")
+@patch("pipeline.ingest.connect_db")
+def test_replay_does_not_retry_recorded_5xx(connect_db_mock, sleep_mock, tmp_path):
+    with WarcWriter(tmp_path) as w:
+        w.write_response("https://example.com/a", 503, "Service Unavailable", {}, b"")
+
+    conn = MagicMock()
+    cur = MagicMock()
+    conn.__enter__.return_value = conn
+    conn.cursor.return_value.__enter__.return_value = cur
+    connect_db_mock.return_value = conn
+    cur.fetchall.side_effect = [
+        [{"url": "https://example.com/a", "etag": None, "last_modified": None}],
+        [],
+    ]
+
+    stats = run_content_ingest(batch_size=1, http_mode="replay", warc_dir=tmp_path)
+
+    assert stats["err"] == 1
+    assert not sleep_mock.called
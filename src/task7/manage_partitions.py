@@ -0,0 +1,64 @@
+from pathlib import Path
+import argparse
+import sys
+
+from dotenv import load_dotenv
+
+SRC_ROOT = Path(__file__).resolve().parents[1]
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from pipeline.db import connect_db
+from pipeline.schema import (
+    CONTENT_PARTITIONS_DEFAULT,
+    CONTENT_TABLE,
+    TIME_PARTITIONED,
+    drop_expired_partitions,
+    drop_legacy_table,
+    ensure_time_partitions,
+    partition_document_content,
+    partition_time_table,
+)
+
+
+def migrate(cur, content_partitions: int, drop_legacy: bool):
+    if partition_document_content(cur, content_partitions):
+        print(f"{CONTENT_TABLE}: hash-partitioned into {content_partitions} partitions")
+    for table in TIME_PARTITIONED:
+        if partition_time_table(cur, table):
+            print(f"{table}: range-partitioned by month")
+    if drop_legacy:
+        for table in (CONTENT_TABLE, *TIME_PARTITIONED):
+            drop_legacy_table(cur, table)
+        print("Dropped *_legacy tables.")
+
+
+def retention(cur, keep_months: int):
+    ensure_time_partitions(cur)
+    for table in TIME_PARTITIONED:
+        for part in drop_expired_partitions(cur, table, keep_months):
+            print(f"Dropped {part}")
+
+
+def main():
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Partition and retention management for pipeline tables.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    m = sub.add_parser("migrate")
+    m.add_argument("--content-partitions", type=int, default=CONTENT_PARTITIONS_DEFAULT)
+    m.add_argument("--drop-legacy", action="store_true")
+    r = sub.add_parser("retention")
+    r.add_argument("--keep-months", type=int, default=6)
+    args = parser.parse_args()
+
+    with connect_db() as conn, conn.cursor() as cur:
+        if args.command == "migrate":
+            migrate(cur, args.content_partitions, args.drop_legacy)
+        else:
+            retention(cur, args.keep_months)
+        conn.commit()
+
+
+if __name__ == "__main__":
+    main()
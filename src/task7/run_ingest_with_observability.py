@@ -1,5 +1,8 @@
+from contextlib import nullcontext
 from datetime import datetime, timedelta
 from pathlib import Path
+import argparse
+import os
 import sys
 import time
 
@@ -10,8 +13,12 @@ SRC_ROOT = Path(__file__).resolve().parents[1]
 if str(SRC_ROOT) not in sys.path:
     sys.path.insert(0, str(SRC_ROOT))
 
+from pipeline.anomaly import failure_rate_alerts
 from pipeline.db import connect_db
-from pipeline.ingest import run_content_ingest
+from pipeline.ingest import ensure_ingest_schema, run_content_ingest
+from pipeline.profiling import PROFILE_DIR_DEFAULT, RunProfiler, profiling_enabled
+from pipeline.schema import ensure_time_partitions
+from pipeline.search import ensure_search_schema, refresh_search_index
 
 PIPELINE_NAME = "content_ingest"
 BASELINE_RUNS = 10
@@ -24,6 +31,8 @@ def _read_local_file(filename: str) -> str:
 
 def ensure_schema(cur):
     cur.execute(_read_local_file("task7_create_tables.sql"))
+    ensure_time_partitions(cur)
+    ensure_ingest_schema(cur)
 
 
 def load_baseline(cur, pipeline_name: str) -> dict:
@@ -32,11 +41,14 @@ def load_baseline(cur, pipeline_name: str) -> dict:
         SELECT
           COALESCE(AVG(error_rate), 0) AS avg_error_rate,
           COALESCE(AVG(run_duration_ms), 0) AS avg_duration_ms,
+          COALESCE(AVG(avg_fetch_ms), 0) AS avg_request_ms,
           COUNT(*) AS sample_count
         FROM (
-          SELECT error_rate, run_duration_ms
+          SELECT error_rate, run_duration_ms, avg_fetch_ms
           FROM pipeline_metrics
           WHERE pipeline_name = %s
+            AND NOT aborted
+            AND NOT profiled
           ORDER BY run_finished_at DESC
           LIMIT %s
         ) t;
@@ -47,6 +59,7 @@ def load_baseline(cur, pipeline_name: str) -> dict:
     return {
         "avg_error_rate": float(row["avg_error_rate"] or 0),
         "avg_duration_ms": float(row["avg_duration_ms"] or 0),
+        "avg_request_ms": float(row["avg_request_ms"] or 0),
         "sample_count": int(row["sample_count"] or 0),
     }
 
@@ -56,10 +69,12 @@ def insert_metric(cur, payload: dict) -> int:
         """
         INSERT INTO pipeline_metrics
           (pipeline_name, run_started_at, run_finished_at, processed_count,
-           ok200_count, ok304_count, error_count, error_rate, run_duration_ms)
+           ok200_count, ok304_count, error_count, error_rate, run_duration_ms, deferred_count, aborted,
+           profiled, avg_fetch_ms)
         VALUES
           (%(pipeline_name)s, %(run_started_at)s, %(run_finished_at)s, %(processed_count)s,
-           %(ok200_count)s, %(ok304_count)s, %(error_count)s, %(error_rate)s, %(run_duration_ms)s)
+           %(ok200_count)s, %(ok304_count)s, %(error_count)s, %(error_rate)s, %(run_duration_ms)s,
+           %(deferred_count)s, %(aborted)s, %(profiled)s, %(avg_fetch_ms)s)
         RETURNING metric_id;
         """,
         payload,
@@ -87,6 +102,26 @@ def insert_alert(
     )
 
 
+def insert_profile(cur, *, metric_id: int, pipeline_name: str, summary: dict):
+    cur.execute(
+        """
+        INSERT INTO pipeline_profiles
+          (metric_id, pipeline_name, artifact_dir, peak_traced_bytes, cpu_top, alloc_top, host_summary)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+        ON CONFLICT (metric_id) DO NOTHING;
+        """,
+        (
+            metric_id,
+            pipeline_name,
+            summary["artifact_dir"],
+            summary["peak_traced_bytes"],
+            Json(summary["cpu_top"]),
+            Json(summary["alloc_top"]),
+            Json(summary["host_summary"]),
+        ),
+    )
+
+
 def latest_pipeline_check(cur):
     cur.execute(
         """
@@ -112,7 +147,6 @@ def evaluate_and_store_alerts(
     alerts = []
     processed = int(stats.get("processed", 0))
     errors = int(stats.get("err", 0))
-    error_rate = (errors / processed) if processed else 0.0
 
     if processed == 0:
         alerts.append(
@@ -124,40 +158,39 @@ def evaluate_and_store_alerts(
             }
         )
 
-    if processed > 0 and error_rate >= 0.30:
+    alerts.extend(failure_rate_alerts(processed, errors, baseline))
+
+    for anomaly in stats.get("anomalies", []):
         alerts.append(
             {
-                "alert_type": "anomalous_failure_rate",
+                "alert_type": anomaly["alert_type"],
+                "severity": anomaly["severity"],
+                "message": f"In-run: {anomaly['message']} Action: {anomaly['action']}.",
+                "details": {**anomaly["details"], "in_run": True, "rule": anomaly["rule"], "action": anomaly["action"]},
+            }
+        )
+
+    if stats.get("aborted"):
+        alerts.append(
+            {
+                "alert_type": "run_aborted",
                 "severity": "critical",
-                "message": f"Failure rate is high ({error_rate:.2%}).",
-                "details": {"error_rate": error_rate, "errors": errors, "processed": processed},
+                "message": "Run was aborted early by the in-run anomaly policy; metrics are partial.",
+                "details": {"processed": processed, "errors": errors},
             }
         )
-    elif processed >= 20 and error_rate >= 0.15:
+
+    deferred = int(stats.get("deferred", 0))
+    if deferred > 0:
         alerts.append(
             {
-                "alert_type": "anomalous_failure_rate",
+                "alert_type": "hosts_deferred",
                 "severity": "warning",
-                "message": f"Failure rate increased ({error_rate:.2%}).",
-                "details": {"error_rate": error_rate, "errors": errors, "processed": processed},
+                "message": f"Circuit breaker deferred {deferred} URLs on failing hosts.",
+                "details": {"deferred": deferred, "hosts": list(stats.get("deferred_hosts", []))},
             }
         )
 
-    avg_error_rate = baseline.get("avg_error_rate", 0.0)
-    if baseline.get("sample_count", 0) >= 3 and avg_error_rate > 0:
-        if error_rate > avg_error_rate * 2 and error_rate >= 0.05:
-            alerts.append(
-                {
-                    "alert_type": "anomalous_failure_rate",
-                    "severity": "warning",
-                    "message": "Failure rate is more than 2x recent baseline.",
-                    "details": {
-                        "current_error_rate": error_rate,
-                        "baseline_error_rate": avg_error_rate,
-                    },
-                }
-            )
-
     avg_duration_ms = baseline.get("avg_duration_ms", 0.0)
     if baseline.get("sample_count", 0) >= 3 and avg_duration_ms > 0:
         if run_duration_ms > avg_duration_ms * 2 and (run_duration_ms - avg_duration_ms) > 5_000:
@@ -205,20 +238,37 @@ def evaluate_and_store_alerts(
 def main():
     load_dotenv()
 
+    parser = argparse.ArgumentParser(description="Run content ingest with metrics and alerts.")
+    parser.add_argument("--profile", action="store_true", help="capture CPU/allocation profiles for this run")
+    parser.add_argument(
+        "--time-budget",
+        type=float,
+        default=float(os.getenv("INGEST_TIME_BUDGET_MINUTES") or 0) or None,
+        help="stop ingest cleanly after this many minutes",
+    )
+    args = parser.parse_args()
+    profiler = RunProfiler() if profiling_enabled(args.profile) else None
+
+    with connect_db() as conn, conn.cursor(cursor_factory=DictCursor) as cur:
+        ensure_schema(cur)
+        baseline = load_baseline(cur, PIPELINE_NAME)
+        conn.commit()
+
     run_started_at = datetime.utcnow()
-    t0 = time.perf_counter()
-    stats = run_content_ingest()
+    deadline = run_started_at + timedelta(minutes=args.time_budget) if args.time_budget else None
+    with profiler or nullcontext():
+        t0 = time.perf_counter()
+        stats = run_content_ingest(profiler=profiler, baseline=baseline, deadline=deadline)
+        run_duration_ms = int((time.perf_counter() - t0) * 1000)
     run_finished_at = datetime.utcnow()
-    run_duration_ms = int((time.perf_counter() - t0) * 1000)
 
     processed = int(stats.get("processed", 0))
     errors = int(stats.get("err", 0))
     error_rate = round((errors / processed), 4) if processed else 0.0
+    fetch_count = int(stats.get("fetch_count", 0))
+    avg_fetch_ms = round(stats.get("fetch_ms", 0.0) / fetch_count, 2) if fetch_count else None
 
     with connect_db() as conn, conn.cursor(cursor_factory=DictCursor) as cur:
-        ensure_schema(cur)
-        baseline = load_baseline(cur, PIPELINE_NAME)
-
         metric_id = insert_metric(
             cur,
             {
@@ -231,9 +281,18 @@ def main():
                 "error_count": errors,
                 "error_rate": error_rate,
                 "run_duration_ms": run_duration_ms,
+                "deferred_count": int(stats.get("deferred", 0)),
+                "aborted": bool(stats.get("aborted", False)),
+                "profiled": profiler is not None,
+                "avg_fetch_ms": avg_fetch_ms,
             },
         )
 
+        if profiler is not None:
+            summary = profiler.save(os.getenv("INGEST_PROFILE_DIR", PROFILE_DIR_DEFAULT), metric_id)
+            insert_profile(cur, metric_id=metric_id, pipeline_name=PIPELINE_NAME, summary=summary)
+            print(f"Profile saved to {summary['artifact_dir']}")
+
         alerts = evaluate_and_store_alerts(
             cur,
             metric_id=metric_id,
@@ -246,7 +305,12 @@ def main():
         )
         conn.commit()
 
+        ensure_search_schema(cur)
+        conn.commit()
+        reindexed = refresh_search_index(conn, cur)
+
     print(f"Run stats: {stats}")
+    print(f"Search index refreshed for {reindexed} documents.")
     print(f"Run duration (ms): {run_duration_ms}")
     print(f"Metric row saved with metric_id={metric_id}")
     print(f"Alerts created: {len(alerts)}")
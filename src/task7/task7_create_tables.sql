@@ -12,6 +12,12 @@ CREATE TABLE IF NOT EXISTS pipeline_metrics (
   created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT NOW()
 );
 
+ALTER TABLE pipeline_metrics
+  ADD COLUMN IF NOT EXISTS deferred_count INTEGER NOT NULL DEFAULT 0,
+  ADD COLUMN IF NOT EXISTS aborted BOOLEAN NOT NULL DEFAULT FALSE,
+  ADD COLUMN IF NOT EXISTS profiled BOOLEAN NOT NULL DEFAULT FALSE,
+  ADD COLUMN IF NOT EXISTS avg_fetch_ms NUMERIC(12,2);
+
 CREATE INDEX IF NOT EXISTS idx_pipeline_metrics_pipeline_time
   ON pipeline_metrics (pipeline_name, run_finished_at DESC);
 
@@ -28,3 +34,14 @@ CREATE TABLE IF NOT EXISTS alerts (
 
 CREATE INDEX IF NOT EXISTS idx_alerts_pipeline_time
   ON alerts (pipeline_name, triggered_at DESC);
+
+CREATE TABLE IF NOT EXISTS pipeline_profiles (
+  metric_id BIGINT PRIMARY KEY,
+  pipeline_name TEXT NOT NULL,
+  artifact_dir TEXT NOT NULL,
+  peak_traced_bytes BIGINT NOT NULL,
+  cpu_top JSONB NOT NULL,
+  alloc_top JSONB NOT NULL,
+  host_summary JSONB NOT NULL,
+  created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT NOW()
+);
@@ -1,27 +1,23 @@
-import os
 import datetime as dt
 from pathlib import Path
+import sys
 import pandas as pd
-import psycopg2
 import gspread
 from gspread.exceptions import WorksheetNotFound
 from google.oauth2.service_account import Credentials
 from dotenv import load_dotenv
 
+SRC_ROOT = Path(__file__).resolve().parents[1]
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from pipeline.db import connect_db
+
 load_dotenv()
 
 spreadsheet_id = "1QOptHKFCY0WIp1JJ4FAXMBXr30MxqOjcs8G6jvzA2Cg"
 TASK4_SQL_PATH = Path(__file__).resolve().parents[1] / "task4" / "task4_analytics_queries.sql"
 
-def open_database_connection():
-    return psycopg2.connect(
-        host=os.getenv("DB_HOST"),
-        port=os.getenv("DB_PORT"),
-        dbname=os.getenv("DB_NAME"),
-        user=os.getenv("DB_USER"),
-        password=os.getenv("DB_PASSWORD"),
-    )
-
 def load_sql_queries(sql_file: Path) -> dict[str, str]:
     queries = {}
     current_name = None
@@ -47,7 +43,7 @@ def load_sql_queries(sql_file: Path) -> dict[str, str]:
     return queries
 
 def run_query(sql_query: str) -> pd.DataFrame:
-    with open_database_connection() as connection:
+    with connect_db() as connection:
         return pd.read_sql(sql_query, connection)
 
 def open_google_sheet():
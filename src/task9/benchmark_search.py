@@ -0,0 +1,83 @@
+from pathlib import Path
+import argparse
+import statistics
+import sys
+import time
+
+from dotenv import load_dotenv
+
+SRC_ROOT = Path(__file__).resolve().parents[1]
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from pipeline.db import connect_db
+from pipeline.search import search_documents
+
+DEFAULT_QUERIES = [
+    "warehouse",
+    "masking policy",
+    "snowpipe streaming",
+    "external table partition",
+    "create or replace function",
+    "time travel retention",
+]
+
+
+def time_calls(fn, repeats: int) -> list[float]:
+    timings = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - t0) * 1000)
+    return timings
+
+
+def ilike_scan(cur, query: str, limit: int):
+    cur.execute(
+        """
+        SELECT url
+        FROM candidate_rk_document_content
+        WHERE content ILIKE %s
+        LIMIT %s;
+        """,
+        (f"%{query}%", limit),
+    )
+    return cur.fetchall()
+
+
+def report(label: str, timings: list[float]):
+    ordered = sorted(timings)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    print(f"  {label:<8} p50={statistics.median(ordered):9.1f} ms  p95={p95:9.1f} ms  max={ordered[-1]:9.1f} ms")
+
+
+def main():
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Benchmark full-text search latency.")
+    parser.add_argument("queries", nargs="*", default=DEFAULT_QUERIES)
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--compare-ilike", action="store_true", help="also time the ILIKE full scan")
+    args = parser.parse_args()
+
+    with connect_db() as conn, conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT COUNT(*), COUNT(search_vector), pg_size_pretty(SUM(pg_column_size(content)))
+            FROM candidate_rk_document_content;
+            """
+        )
+        rows, indexed, size = cur.fetchone()
+        print(f"Corpus: {rows} documents ({size}), {indexed} indexed")
+
+        for q in args.queries:
+            hits = len(search_documents(cur, q, args.limit))
+            print(f"{q!r}: {hits} hits")
+            report("fts", time_calls(lambda: search_documents(cur, q, args.limit), args.repeats))
+            if args.compare_ilike:
+                report("ilike", time_calls(lambda: ilike_scan(cur, q, args.limit), max(1, args.repeats // 5)))
+
+
+if __name__ == "__main__":
+    main()
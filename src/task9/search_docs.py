@@ -0,0 +1,36 @@
+from pathlib import Path
+import argparse
+import sys
+
+from dotenv import load_dotenv
+
+SRC_ROOT = Path(__file__).resolve().parents[1]
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from pipeline.db import connect_db
+from pipeline.search import ensure_search_schema, refresh_search_index, search_documents
+
+
+def main():
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Full-text search over ingested docs.")
+    parser.add_argument("query", nargs="?", help="web-search style query, e.g. 'snowpipe -kafka \"cost\"'")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--refresh", action="store_true", help="index documents whose content_hash changed first")
+    args = parser.parse_args()
+
+    with connect_db() as conn, conn.cursor() as cur:
+        if args.refresh:
+            ensure_search_schema(cur)
+            conn.commit()
+            print(f"Indexed {refresh_search_index(conn, cur)} changed documents.")
+        if args.query:
+            for hit in search_documents(cur, args.query, args.limit):
+                print(f"{hit['rank']:.4f}  {hit['url']}")
+                print(f"        {' '.join(hit['snippet'].split())}")
+
+
+if __name__ == "__main__":
+    main()